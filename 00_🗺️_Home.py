@@ -1,154 +1,45 @@
 # IMPORT LIBRARIES
-import streamlit as st
-from PIL import Image
 import pandas as pd
-import inflection
-import requests
+import streamlit as st
+import streamlit.components.v1 as components
+from fome_zero.data import load_dataset
+from fome_zero.rates import get_rates
+from fome_zero.conversion import load_converted
+from fome_zero.filters import filter_cities, filter_countries
+from fome_zero.geo import nearby_restaurants
+from fome_zero.maps import cached_map, map_key
+from fome_zero.profiling import debug_panel, stage, start_rerun
+from fome_zero.rollup import load_rollup
+from fome_zero.sketches import STANDARD_ERROR
 from millify import prettify
-import folium
-from streamlit_folium import folium_static
-from folium.plugins import MarkerCluster
 
 # =============
 # FUNÇÕES
 # =============
 
-def data_clean(df1):
-    # Linhas Nulas
-    df1.dropna(inplace=True)
-
-    # Linhas duplicadas
-    df1.drop_duplicates(inplace=True)
-
-    # A coluna "Switch to order menu" possui apenas valores 0
-    df1.drop('Switch to order menu', axis=1, inplace=True)
-
-    # Melhorando o nome das colunas
-    df1.columns = list(map(lambda x: inflection.titleize(x), df1.columns))
-    df1.columns = list(map(lambda x: x.replace(" ", ""), df1.columns))
-    df1.columns = list(map(lambda x: inflection.underscore(x), df1.columns))
-
-    # Transformando Country Code
-    countries = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-    }
-    df1['country_code'] = df1['country_code'].apply(lambda x: countries[x])
-    df1.rename(columns={'country_code':'country'}, inplace=True)
-
-    # Criando a coluna com o nome das cores
-    colors = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-    }
-    df1['color_nome'] = df1['rating_color'].apply(lambda x: colors[x])
-
-    # Categorizando o price range
-    price = {1:'cheap',
-            2:'normal',
-            3:'expensive',
-            4:'gourmet'}
-
-    df1['price_range'] = df1['price_range'].apply(lambda x: price[x])
-
-    # Mantendo apenas um tipo de "cuisine"
-    df1['cuisines'] = df1['cuisines'].apply(lambda x: x.split(',')[0])
-
-    # Excluindo outlier na coluna average_cost_for_two
-    df1.drop(df1[df1['average_cost_for_two']==25000017].index, inplace=True)
-
-    return df1
-
-# Convertendo o average_cost_for_two
-# Por otimização, serão criadas duas funções, de maneira que a API seja acessada apenas uma vez
-def get_rates(to_currency='USD'):
-    '''
-        Essa função vai obter a taxa de conversão DE uma determinada moeda PARA todas as outras moedas através de uma API;
-        Por padrão, a moeda a ser convertida é o Dolar (USD), mas podemos alterar isso através do parâmetro to_currency
-    '''
-    url = 'https://api.exchangerate-api.com/v4/latest/'+str(to_currency)
-    response = requests.get(url)
-    data = response.json()
-
-    return data
-
-def convert_currency(amount, from_currency):
-    '''
-       Essa função vai realizar a conversão de um determinado valor (amount) a partir de uma determinada moeda (from_currency);
-       Como a taxa que obtemos pela API é A PARTIR do dólar, aqui vamos fazer a operação inversa (divisão) para obter a 
-       taxa de conversão PARA o dólar.
-    '''
-    # Salvando a taxa de conversão a partir do json recebido pela API
-    exchange_rate = data['rates'][from_currency]
-    # Como a coluna original possuía apenas números inteiros, vamos arredondar para manter também números inteiros
-    converted_amount = round(amount/exchange_rate)
-
-    return converted_amount
-
-def convert_dataset(df1):
-    # Criamos um dicionário para a codificação das moedas de acordo com os códigos aceitos pela API
-    currency = {'Botswana Pula(P)':'BWP',
-                'Brazilian Real(R$)':'BRL',
-                'Dollar($)':'USD',
-                'Emirati Diram(AED)':'AED',
-                'Indian Rupees(Rs.)':'INR',
-                'Indonesian Rupiah(IDR)':'IDR',
-                'NewZealand($)':'NZD',
-                'Pounds(£)':'GBP',
-                'Qatari Rial(QR)':'QAR',
-                'Rand(R)':'ZAR',
-                'Sri Lankan Rupee(LKR)':'LKR',
-                'Turkish Lira(TL)':'TRY'}
-    
-    df_converted = df1.copy()
-    df_converted['average_cost_for_two'] = df1[['currency', 'average_cost_for_two']].apply(lambda x: convert_currency(x['average_cost_for_two'], currency[x['currency']]), axis=1)
-    df_converted['currency'] = 'Dollar($)'
-
-    return df_converted
-
-def create_map(df1):
-    map = folium.Map()
-    marker_cluster = MarkerCluster().add_to(map)
-
-    for _, line in df1.iterrows():
-        folium.Marker(location=[line['latitude'], line['longitude']], 
-                      popup = folium.Popup(f"""<h5> <b> {line['restaurant_name']} </b> </h5> <br>
-                                                Cozinha: {line['cuisines']} <br>
-                                                Preço médio para dois: {line['average_cost_for_two']} ({line['currency']}) <br>
-                                                Avaliação: {line['aggregate_rating']} / 5.0 <br> """,
-                                                max_width= 500), 
-                      icon=folium.Icon(color=line['color_nome'], icon="utensils", prefix='fa')).add_to(marker_cluster)
-    
-    folium_static(map, width=1024, height=600)
+def create_map(df1, key, bounds=None, height=610):
+    # O html do mapa é gerado uma vez por combinação de filtros e reaproveitado nas próximas execuções
+    html = cached_map(key, df1, bounds)
+    with stage('render map'):
+        components.html(html, width=1024, height=height)
 
     return None
 
+# Com o copy-on-write, cada execução recebe uma cópia rasa do dataset em cache: as colunas são compartilhadas e
+# qualquer escrita feita pela página gera uma cópia local, sem alterar o cache
+pd.set_option('mode.copy_on_write', True)
+
 # =========================
 # DATASET
 # =========================
-df0 = pd.read_csv("dataset/zomato.csv")
-df1 = data_clean(df0)
+# Mede o tempo de cada etapa desta execução (cascata na barra lateral com ?debug=1 na URL)
+start_rerun('Home')
 
-data = get_rates()
-df_converted = convert_dataset(df1)
+# Apenas as colunas usadas nesta página são lidas do dataset
+COLUMNS = ['restaurant_id', 'restaurant_name', 'country', 'city', 'latitude', 'longitude', 'cuisines', 'average_cost_for_two', 'currency', 'aggregate_rating', 'votes', 'color_nome']
+df1 = load_dataset(columns=COLUMNS)
+
+rates = get_rates()
 
 
 
@@ -162,18 +53,19 @@ st.set_page_config(
 )
 
 # SIDEBAR
-logo = Image.open('logo.png')
 col1, col2 = st.sidebar.columns([1,4], gap='small')
-col1.image(logo, width=50)
+col1.image('logo.png', width=50)
 col2.markdown('# Projeto Fome Zero')
 
 st.sidebar.markdown("""---""")
 st.sidebar.markdown('## Filtros')
 
-converter = st.sidebar.toggle('Converter valores para Dólar')
+converter = st.sidebar.toggle('Converter valores para Dólar', disabled=rates is None) and rates is not None
+if rates is None:
+    st.sidebar.caption('Cotações indisponíveis no momento, os valores estão na moeda original')
 if converter:
-    st.sidebar.markdown(f"Valores convertidos para dólar segundo cotação do dia {data['date']}")
-    df1 = df_converted
+    st.sidebar.markdown(f"Valores convertidos para dólar segundo cotação do dia {rates['date']}")
+    df1 = load_converted(rates, columns=COLUMNS)
 
 filtrar_paises = st.sidebar.toggle('Filtro de Países')
 countries = df1['country'].unique().tolist()
@@ -183,7 +75,9 @@ if filtrar_paises:
         df1['country'].unique().tolist(),
         default=df1['country'].unique().tolist()
     )
-df1 = df1[df1['country'].isin(countries)]
+df_all = df1
+df1 = filter_countries(df1, countries)
+cube = load_rollup(rates if converter else None).countries(countries)
 
 st.sidebar.markdown("""---""")
 st.sidebar.markdown("Powered by @victorjoordao")
@@ -194,11 +88,35 @@ st.markdown('## Aqui você encontra os melhores restaurantes ao redor do mundo')
 st.markdown("""---""")
 st.markdown('### Temos as seguintes métricas dentro da nossa empresa:')
 
+# No modo aproximado (FOME_ZERO_DISTINCT=approx), restaurantes, cidades e culinárias vêm dos sketches HyperLogLog
+approx = f'Contagem aproximada (erro padrão de {STANDARD_ERROR:.1%})' if cube.sketches is not None else None
 col1, col2, col3, col4, col5 = st.columns(5)
-col1.metric('Restaurantes Cadastrados', df1['restaurant_id'].nunique())
-col2.metric('Países Cadastrados', df1['country'].nunique())
-col3.metric('Cidades Cadastradas', df1['city'].nunique())
-col4.metric('Total de avaliações na plataforma', prettify(df1['votes'].sum()).replace(',','.'))
-col5.metric('Tipos de culinárias oferecidas', df1['cuisines'].nunique())
+col1.metric('Restaurantes Cadastrados', cube.total('restaurants'), help=approx)
+col2.metric('Países Cadastrados', cube.total('country'))
+col3.metric('Cidades Cadastradas', cube.total('city'), help=approx)
+col4.metric('Total de avaliações na plataforma', prettify(cube.total('votes')).replace(',','.'))
+col5.metric('Tipos de culinárias oferecidas', cube.total('cuisines'), help=approx)
+
+create_map(df1, key=map_key(countries, converter, rates['date'] if rates else None))
 
-create_map(df1)
\ No newline at end of file
+st.markdown("""---""")
+st.markdown('### Restaurantes próximos')
+
+col1, col2 = st.columns(2)
+city = col1.selectbox('Perto de qual cidade?', sorted(cube.cells['city'].unique().tolist()))
+radius = col2.slider('Distância máxima (km)', min_value=1, max_value=50, value=5)
+
+# Ponto de referência: a mediana das coordenadas dos restaurantes da cidade; a busca usa o índice espacial
+# (fome_zero.geo), sem calcular a distância para todos os restaurantes
+center = filter_cities(df_all, [city])[['latitude', 'longitude']].median()
+nearby = nearby_restaurants(df_all, center['latitude'], center['longitude'], radius)
+
+st.markdown(f'{len(nearby)} restaurantes a até {radius} km do centro de {city}')
+if len(nearby):
+    st.dataframe(nearby[['restaurant_name', 'city', 'cuisines', 'average_cost_for_two', 'currency', 'aggregate_rating', 'distance_km']],
+                 use_container_width=True, hide_index=True)
+    bounds = [[nearby['latitude'].min(), nearby['longitude'].min()], [nearby['latitude'].max(), nearby['longitude'].max()]]
+    key = map_key(nearby['country'].unique().tolist(), converter, rates['date'] if rates else None) + (('nearby', city, radius),)
+    create_map(nearby, key=key, bounds=bounds, height=450)
+
+debug_panel()
\ No newline at end of file
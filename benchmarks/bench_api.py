@@ -0,0 +1,107 @@
+'''
+    Teste de carga da API (fome_zero.api): sobe o servidor em outro processo e dispara --connections clientes
+    simultâneos (conexões keep-alive) durante --seconds segundos sobre as rotas em PATHS. Mostra as requisições por
+    segundo e a latência p50/p99, com e sem If-None-Match (respostas 304 pelo ETag).
+
+    Uso: python benchmarks/bench_api.py [--connections 32] [--seconds 10] [--server builtin|uvicorn]
+'''
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PATHS = ['/api/kpis', '/api/countries/restaurants', '/api/countries/cost?currency=USD',
+         '/api/countries/rating?countries=Brazil,India', '/api/cities/best', '/api/cities/restaurants?rating_above=4',
+         '/api/cities/cuisines', '/api/cuisines/rating?n=10&order=worst', '/api/cuisines/champions',
+         '/api/restaurants/top?n=10&countries=India', '/api/restaurants/search?q=pizza']
+
+async def request(reader, writer, path, etag=None):
+    headers = f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+    if etag is not None:
+        headers += f'If-None-Match: {etag}\r\n'
+    writer.write((headers + '\r\n').encode('latin-1'))
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    response = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        response[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(response.get('content-length', 0)))
+
+    return status, response.get('etag')
+
+async def client(port, deadline, latencies, etags, revalidate, seed):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    i = seed
+    while time.perf_counter() < deadline:
+        path = PATHS[i % len(PATHS)]
+        start = time.perf_counter()
+        status, etag = await request(reader, writer, path, etags.get(path) if revalidate else None)
+        latencies.append(time.perf_counter() - start)
+        assert status in (200, 304), (path, status)
+        etags[path] = etag
+        i += 1
+    writer.close()
+
+async def load(port, connections, seconds, revalidate):
+    latencies, etags = [], {}
+    # Uma passada para aquecer os caches e conhecer os ETags
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for path in PATHS:
+        etags[path] = (await request(reader, writer, path))[1]
+    writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, start + seconds, latencies, etags, revalidate, i) for i in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    return len(latencies) / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+async def wait_ready(port, process, timeout=300):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('o servidor da API terminou antes de ficar pronto')
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            await asyncio.sleep(0.2)
+            continue
+        await request(reader, writer, '/api/version')
+        writer.close()
+        return
+    raise TimeoutError('o servidor da API não respondeu')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--server', choices=['builtin', 'uvicorn'], default='builtin')
+    args = parser.parse_args()
+
+    process = subprocess.Popen([sys.executable, '-m', 'fome_zero.api', '--port', str(args.port), '--server', args.server],
+                               cwd=ROOT, env=dict(os.environ, PYTHONPATH=str(ROOT)))
+    try:
+        start = time.perf_counter()
+        asyncio.run(wait_ready(args.port, process))
+        print(f'servidor pronto em {time.perf_counter() - start:.1f}s ({args.connections} conexões, {args.seconds:.0f}s)')
+
+        print(f"{'modo':<24}{'req/s':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+        for label, revalidate in (('200 (corpo em cache)', False), ('304 (If-None-Match)', True)):
+            qps, p50, p99 = asyncio.run(load(args.port, args.connections, args.seconds, revalidate))
+            print(f'{label:<24}{qps:>10.0f}{p50:>10.2f}{p99:>10.2f}')
+    finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+'''
+    Mede, para cada gráfico de fome_zero.charts, o tempo de montar a figura a partir do cubo, o tempo de uma nova
+    execução com os mesmos filtros (figura vinda do cache) e o tamanho do json enviado ao navegador, para o cubo de
+    todos os países e para o de --countries.
+
+    Uso: python benchmarks/bench_charts.py [--countries India,Brazil,England] [--repeat 5]
+'''
+import argparse
+import inspect
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# O tema padrão das figuras passa a ser o do Streamlit, como no app
+import streamlit.elements.plotly_chart  # noqa: F401
+
+from fome_zero import charts
+from fome_zero.rollup import load_rollup
+
+def measure(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--countries', default='India,Brazil,England')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rollup = load_rollup()
+    cubes = [('todos os países', rollup), (args.countries, rollup.countries(args.countries.split(',')))]
+
+    # Primeira figura fora da medição: importa o plotly e carrega o tema
+    charts.hist_ratings(rollup)
+
+    print(f"{'gráfico':<32}{'cubo':<28}{'montagem (ms)':>15}{'cache (ms)':>12}{'json (KB)':>11}")
+    for name, func in inspect.getmembers(charts, inspect.isfunction):
+        if func.__module__ != charts.__name__ or not name.startswith(('plot_', 'top_', 'hist_')):
+            continue
+        call_args = (10,) if 'qtd_top' in inspect.signature(func).parameters else ()
+        for label, cube in cubes:
+            def build():
+                charts._figures.clear()
+                return func(cube, *call_args)
+
+            built = measure(build, args.repeat)
+            cached = measure(lambda: func(cube, *call_args), args.repeat)
+            size = len(charts.figure_json(func(cube, *call_args))) / 1024
+            print(f'{name:<32}{label[:26]:<28}{built * 1000:>15.2f}{cached * 1000:>12.3f}{size:>11.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''
+    Mede o tempo de partida a frio (processo novo) para carregar o dataset: a partir do CSV (leitura + data_clean)
+    e a partir do arquivo colunar gerado por fome_zero.store, com todas as colunas ou apenas as de uma página.
+
+    Uso: python benchmarks/bench_cold_start.py [--repeat 5]
+'''
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# O import do pandas/pyarrow é o mesmo nos dois casos, então apenas o load_dataset é cronometrado
+CHILD = '''
+import time
+import pyarrow
+from fome_zero.data import load_dataset
+start = time.perf_counter()
+df = load_dataset(columns={columns!r})
+print(time.perf_counter() - start)
+'''
+
+# Colunas usadas pela página Visão Cidades
+PAGE_COLUMNS = ['restaurant_id', 'country', 'city', 'cuisines', 'aggregate_rating']
+
+def run(cache_dir, columns):
+    env = dict(os.environ, FOME_ZERO_CACHE_DIR=cache_dir)
+    out = subprocess.run([sys.executable, '-c', CHILD.format(columns=columns)], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+
+    return float(out.stdout.strip())
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = {'CSV + data_clean': [], 'arquivo colunar (todas as colunas)': [], 'arquivo colunar (colunas da página)': []}
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # A primeira execução não encontra o arquivo colunar: lê o CSV, limpa e grava o arquivo
+            results['CSV + data_clean'].append(run(cache_dir, None))
+            results['arquivo colunar (todas as colunas)'].append(run(cache_dir, None))
+            results['arquivo colunar (colunas da página)'].append(run(cache_dir, PAGE_COLUMNS))
+
+    print(f"{'origem':<40}{'melhor (s)':>12}{'mediana (s)':>14}")
+    for name, times in results.items():
+        times.sort()
+        print(f'{name:<40}{times[0]:>12.3f}{times[len(times) // 2]:>14.3f}')
+
+if __name__ == '__main__':
+    main()
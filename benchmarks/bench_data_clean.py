@@ -0,0 +1,81 @@
+'''
+    Compara a limpeza atual (fome_zero.data.data_clean) com a versão original, baseada em apply linha a linha,
+    no zomato.csv e em uma cópia sintética 100x maior.
+
+    Uso: python benchmarks/bench_data_clean.py [--scale 100] [--repeat 3]
+'''
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import inflection
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fome_zero.data import COLORS, COUNTRIES, DATASET_PATH, PRICES, data_clean
+
+def legacy_data_clean(df1):
+    # Versão original, mantida aqui apenas como referência para o benchmark
+    df1.dropna(inplace=True)
+    df1.drop_duplicates(inplace=True)
+    df1.drop('Switch to order menu', axis=1, inplace=True)
+    df1.columns = list(map(lambda x: inflection.titleize(x), df1.columns))
+    df1.columns = list(map(lambda x: x.replace(" ", ""), df1.columns))
+    df1.columns = list(map(lambda x: inflection.underscore(x), df1.columns))
+    df1['country_code'] = df1['country_code'].apply(lambda x: COUNTRIES[x])
+    df1.rename(columns={'country_code':'country'}, inplace=True)
+    df1['color_nome'] = df1['rating_color'].apply(lambda x: COLORS[x])
+    df1['price_range'] = df1['price_range'].apply(lambda x: PRICES[x])
+    df1['cuisines'] = df1['cuisines'].apply(lambda x: x.split(',')[0])
+    df1.drop(df1[df1['average_cost_for_two']==25000017].index, inplace=True)
+
+    return df1
+
+def upscale(df0, scale):
+    '''
+        Replica o dataset bruto scale vezes, deslocando o Restaurant ID de cada cópia para que as linhas não sejam
+        removidas como duplicadas.
+    '''
+    copies = []
+    for i in range(scale):
+        copy = df0.copy()
+        copy['Restaurant ID'] = copy['Restaurant ID'] + i * 20_000_000
+        copies.append(copy)
+
+    return pd.concat(copies, ignore_index=True)
+
+def measure(func, df0, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        df = df0.copy()
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = func(df0.copy())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak, result.memory_usage(deep=True).sum()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    raw = pd.read_csv(DATASET_PATH)
+    datasets = [('zomato.csv', raw), (f'zomato.csv x{args.scale}', upscale(raw, args.scale))]
+
+    print(f"{'dataset':<20}{'linhas':>10}{'versão':>10}{'tempo (s)':>12}{'pico (MB)':>12}{'resultado (MB)':>16}")
+    for name, df0 in datasets:
+        for label, func in (('original', legacy_data_clean), ('atual', data_clean)):
+            elapsed, peak, size = measure(func, df0, args.repeat)
+            print(f'{name:<20}{len(df0):>10}{label:>10}{elapsed:>12.3f}{peak / 1e6:>12.1f}{size / 1e6:>16.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+'''
+    Compara as contagens de distintos exatas (nunique sobre as linhas do dataset filtrado e o cubo de
+    fome_zero.rollup) com as aproximadas dos sketches HyperLogLog (fome_zero.sketches), no dataset sintético de
+    bench_suite com --rows linhas: tempo de cada consulta e erro relativo da aproximação.
+
+    Uso: python benchmarks/bench_distinct.py [--rows 1000000] [--repeat 5]
+'''
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_suite import COUNTRIES, parse_size, synthetic_dataset
+from fome_zero.data import data_clean
+from fome_zero.rollup import build_rollup
+from fome_zero.sketches import STANDARD_ERROR, build_sketches
+
+def measure(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+def queries(df1, cube, sketches):
+    '''
+        (nome, exata sobre as linhas, exata sobre o cubo, aproximada): os totais da Home e as tabelas de
+        plot_cuisines_per_country, plot_rest_per_city e plot_top_cuisines, para os países de COUNTRIES.
+    '''
+    rows = lambda: df1[df1['country'].isin(COUNTRIES)]
+    for column, total in (('restaurant_id', 'restaurants'), ('city', 'city'), ('cuisines', 'cuisines')):
+        yield (f'total {column}', lambda column=column: rows()[column].nunique(),
+               lambda total=total: cube.countries(COUNTRIES).total(total),
+               lambda column=column: sketches.countries(COUNTRIES).count(column))
+
+    for keys, column in ((['country'], 'cuisines'), (['city', 'country'], 'restaurant_id'), (['city', 'country'], 'cuisines')):
+        exact_cube = ((lambda keys=keys: cube.countries(COUNTRIES).restaurants_by(keys)['restaurant_id'])
+                      if column == 'restaurant_id' else
+                      (lambda keys=keys, column=column: cube.countries(COUNTRIES).distinct_by(keys, column)[column]))
+        yield (f"{column} por {'/'.join(keys)}",
+               lambda keys=keys, column=column: rows().groupby(keys, observed=True)[column].nunique(),
+               exact_cube,
+               lambda keys=keys, column=column: sketches.countries(COUNTRIES).count_by(keys, column)[column])
+
+def relative_error(exact, approx):
+    # Maior erro relativo entre as contagens (ou o erro do total)
+    if hasattr(exact, 'index'):
+        return ((approx.reindex(exact.index) - exact).abs() / exact).max()
+
+    return abs(approx - exact) / exact
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', default='1M')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df1 = data_clean(synthetic_dataset(parse_size(args.rows)))
+    seconds, cube = measure(lambda: build_rollup(df1), 1)
+    print(f'{len(df1)} linhas, cubo com {len(cube.cells)} células montado em {seconds * 1000:.0f}ms')
+    seconds, sketches = measure(lambda: build_sketches(df1), 1)
+    print(f'{len(sketches.keys)} sketches de país/cidade montados em {seconds * 1000:.0f}ms '
+          f'(erro padrão esperado de {STANDARD_ERROR:.1%})')
+
+    print(f"{'consulta':<34}{'linhas (ms)':>13}{'cubo (ms)':>11}{'sketches (ms)':>15}{'erro máximo':>13}")
+    for name, rows, exact, approx in queries(df1, cube, sketches):
+        rows_seconds, expected = measure(rows, args.repeat)
+        cube_seconds, _ = measure(exact, args.repeat)
+        approx_seconds, result = measure(approx, args.repeat)
+        print(f'{name:<34}{rows_seconds * 1000:>13.2f}{cube_seconds * 1000:>11.2f}{approx_seconds * 1000:>15.2f}'
+              f'{relative_error(expected, result):>13.2%}')
+
+if __name__ == '__main__':
+    main()
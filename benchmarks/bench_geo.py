@@ -0,0 +1,72 @@
+'''
+    Compara as consultas por raio e por retângulo do índice espacial (fome_zero.geo) com o cálculo da distância
+    para todas as linhas, no dataset replicado até --rows linhas (cada cópia com as coordenadas levemente
+    deslocadas), conferindo que o resultado é o mesmo.
+
+    Uso: python benchmarks/bench_geo.py [--rows 1000000] [--repeat 20]
+'''
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fome_zero.data import load_dataset
+from fome_zero.geo import GridIndex, haversine_km
+
+# (descrição, latitude, longitude, raio em km)
+NEARBY = [('Nova Délhi, 2 km', 28.6139, 77.2090, 2), ('São Paulo, 10 km', -23.5505, -46.6333, 10),
+          ('Londres, 50 km', 51.5074, -0.1278, 50)]
+
+# (descrição, sul, oeste, norte, leste): áreas visíveis de um mapa
+BOXES = [('centro de Londres', 51.48, -0.20, 51.54, -0.05), ('Índia', 6.0, 68.0, 36.0, 98.0)]
+
+def replicate(df1, rows, seed=0):
+    '''
+        Replica as coordenadas até rows linhas, deslocando cada cópia em até ~1 km para que não fiquem sobrepostas.
+    '''
+    rng = np.random.default_rng(seed)
+    copies = -(-rows // len(df1))
+    lat = np.tile(df1['latitude'].to_numpy(), copies)[:rows] + rng.uniform(-0.01, 0.01, rows)
+    lon = np.tile(df1['longitude'].to_numpy(), copies)[:rows] + rng.uniform(-0.01, 0.01, rows)
+
+    return np.clip(lat, -90, 90), (lon + 180) % 360 - 180
+
+def measure(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    lat, lon = replicate(load_dataset(columns=['latitude', 'longitude']), args.rows)
+    build, index = measure(lambda: GridIndex(lat, lon), 1)
+    print(f'índice de {len(lat)} linhas montado em {build:.3f}s')
+
+    print(f"{'consulta':<28}{'linhas':>10}{'varredura (ms)':>16}{'índice (ms)':>13}{'ganho':>9}")
+    for label, plat, plon, radius in NEARBY:
+        scan, expected = measure(lambda: np.flatnonzero(haversine_km(plat, plon, lat, lon) <= radius), args.repeat)
+        indexed, (positions, _) = measure(lambda: index.nearby(plat, plon, radius), args.repeat)
+        assert np.array_equal(np.sort(positions), expected)
+        print(f'{label:<28}{len(positions):>10}{scan * 1000:>16.3f}{indexed * 1000:>13.3f}{scan / indexed:>8.1f}x')
+
+    for label, south, west, north, east in BOXES:
+        scan, expected = measure(lambda: np.flatnonzero((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)),
+                                 args.repeat)
+        indexed, positions = measure(lambda: index.within_box(south, west, north, east), args.repeat)
+        assert np.array_equal(positions, expected)
+        print(f'{label:<28}{len(positions):>10}{scan * 1000:>16.3f}{indexed * 1000:>13.3f}{scan / indexed:>8.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+'''
+    Mede o custo de importação de cada módulo do pacote fome_zero e das importações de cada página, cada um em um
+    processo novo (python -X importtime), e indica quais dependências pesadas foram carregadas. Serve para perceber
+    quando uma mudança passa a importar algo caro na inicialização.
+
+    Uso: python benchmarks/bench_import_time.py [--repeat 3] [--json resultado.json]
+'''
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Dependências que devem ser importadas apenas por quem as usa (o pyarrow não entra: o próprio pandas o importa)
+HEAVY = ['streamlit', 'plotly', 'folium', 'requests', 'inflection', 'PIL']
+
+def page_imports(path):
+    '''
+        Código com apenas as importações do script da página (sem executar o Streamlit).
+    '''
+    tree = ast.parse(path.read_text(encoding='utf-8'))
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def import_time(code):
+    '''
+        Executa code em um processo novo com -X importtime e retorna o tempo total de importação (em ms) e os
+        módulos de primeiro nível carregados.
+    '''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+    total_us = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        loaded.add(name.strip().split('.')[0])
+        # Apenas as importações de nível mais alto: o tempo delas já inclui o das dependências
+        if not name.startswith('  '):
+            total_us += int(cumulative)
+
+    return total_us / 1000, loaded
+
+def targets():
+    # Referências: todo módulo paga pelo pandas e toda página paga pelo streamlit
+    yield 'pandas', 'import pandas'
+    yield 'streamlit', 'import streamlit'
+    for path in sorted((ROOT / 'fome_zero').glob('*.py')):
+        module = 'fome_zero' if path.stem == '__init__' else f'fome_zero.{path.stem}'
+        yield module, f'import {module}'
+    for path in sorted(ROOT.glob('*.py')) + sorted((ROOT / 'pages').glob('*.py')):
+        yield path.name, page_imports(path)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='arquivo onde salvar os tempos medidos')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'módulo':<45}{'importação (ms)':>17}  dependências pesadas")
+    for name, code in targets():
+        best = float('inf')
+        for _ in range(args.repeat):
+            elapsed, loaded = import_time(code)
+            best = min(best, elapsed)
+        heavy = [dep for dep in HEAVY if dep in loaded]
+        results[name] = {'ms': round(best, 1), 'heavy': heavy}
+        print(f"{name:<45}{best:>17.1f}  {', '.join(heavy) or '-'}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+'''
+    Compara a geração do arquivo colunar lendo o CSV inteiro (fome_zero.data.build_store) com a ingestão em blocos
+    (fome_zero.ingest), em uma cópia sintética do zomato.csv --scale vezes maior. Cada modo roda em um processo
+    separado para medir o pico de memória (RSS).
+
+    Uso: python benchmarks/bench_ingest.py [--scale 200] [--chunksize 200000]
+'''
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_data_clean import upscale
+from fome_zero.data import DATASET_PATH
+
+RUN = '''
+import json, re, sys, time
+sys.path.insert(0, {root!r})
+from fome_zero.data import build_store
+from fome_zero.ingest import ingest_csv
+start = time.perf_counter()
+if {mode!r} == 'inteiro':
+    build_store({csv!r}, {out!r})
+else:
+    ingest_csv({csv!r}, {out!r} + '/blocos.arrow', chunksize={chunksize})
+# VmHWM é o pico de RSS deste processo (o ru_maxrss herdaria o pico do processo pai)
+peak_kb = int(re.search(r'VmHWM:\\s+(\\d+)', open('/proc/self/status').read()).group(1))
+print(json.dumps({{'s': time.perf_counter() - start, 'rss_mb': peak_kb / 1024}}))
+'''
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=200)
+    parser.add_argument('--chunksize', type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = Path(tmp) / 'zomato.csv'
+        upscale(pd.read_csv(DATASET_PATH), args.scale).to_csv(csv, index=False)
+        print(f'{csv.name} x{args.scale}: {csv.stat().st_size / 1e6:.0f} MB')
+
+        print(f"{'modo':<10}{'tempo (s)':>12}{'pico RSS (MB)':>16}")
+        for mode in ('inteiro', 'blocos'):
+            code = RUN.format(root=str(ROOT), mode=mode, csv=str(csv), out=tmp, chunksize=args.chunksize)
+            result = json.loads(subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                               check=True).stdout)
+            print(f"{mode:<10}{result['s']:>12.2f}{result['rss_mb']:>16.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+'''
+    Relatório de memória do dataset limpo, coluna a coluna: bytes com os textos como objetos Python (como antes da
+    armazenagem compacta) e com os tipos atuais (categorias e colunas de texto do Arrow). Mostra também o total em
+    memória depois de cada página carregar as suas colunas, já que as colunas de endereço só são lidas sob demanda.
+
+    Uso: python benchmarks/bench_memory.py [--json resultado.json]
+'''
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fome_zero.data import DATASET_PATH, load_dataset, memory_report, read_clean
+
+# Colunas de texto que eram objetos Python antes da armazenagem compacta
+OBJECT_COLUMNS = ['restaurant_name', 'address', 'locality', 'locality_verbose', 'rating_color']
+
+# Colunas lidas por cada página (as dos agregados e snapshots não passam pelo dataset)
+PAGES = {
+    'Home': ['restaurant_id', 'restaurant_name', 'country', 'city', 'latitude', 'longitude', 'cuisines',
+             'average_cost_for_two', 'currency', 'aggregate_rating', 'votes', 'color_nome'],
+    'Visão Restaurantes': ['restaurant_id', 'restaurant_name', 'country', 'city', 'cuisines', 'average_cost_for_two',
+                           'currency', 'aggregate_rating', 'votes'],
+}
+
+def column_bytes(df):
+    return df.memory_usage(deep=True, index=False).astype('int64')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--json', help='arquivo onde salvar os bytes medidos')
+    args = parser.parse_args()
+
+    df1 = read_clean(DATASET_PATH)
+    after = column_bytes(df1)
+    before = column_bytes(df1.astype({col: object for col in OBJECT_COLUMNS}))
+
+    print(f"{'coluna':<22}{'tipo':>16}{'antes (KB)':>13}{'depois (KB)':>13}{'redução':>9}")
+    for col in df1.columns:
+        dtype = df1[col].dtype
+        dtype = f'string[{dtype.storage}]' if dtype == 'string' else str(dtype)
+        print(f'{col:<22}{dtype:>16}{before[col] / 1024:>13.1f}{after[col] / 1024:>13.1f}{before[col] / after[col]:>8.1f}x')
+    print(f"{'total':<22}{'':>16}{before.sum() / 1024:>13.1f}{after.sum() / 1024:>13.1f}{before.sum() / after.sum():>8.1f}x")
+
+    print()
+    resident = {}
+    for page, columns in PAGES.items():
+        load_dataset(columns=columns)
+        resident[page] = sum(memory_report().values())
+        print(f'em memória depois de {page}: {resident[page] / 1024:.1f} KB ({len(memory_report())} colunas)')
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'before': before.to_dict(), 'after': after.to_dict(), 'resident': resident},
+                                              indent=2, ensure_ascii=False), encoding='utf-8')
+
+if __name__ == '__main__':
+    main()
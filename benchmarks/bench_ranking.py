@@ -0,0 +1,59 @@
+'''
+    Compara o ranking por ordenação completa (sort_values + head) com a seleção parcial de fome_zero.ranking no
+    dataset limpo replicado até --rows linhas, conferindo que o resultado é o mesmo.
+
+    Uso: python benchmarks/bench_ranking.py [--rows 1000000] [--repeat 5]
+'''
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fome_zero.data import load_dataset
+from fome_zero.ranking import top_restaurants
+
+COLUMNS = ['restaurant_id', 'restaurant_name', 'country', 'city', 'cuisines', 'average_cost_for_two', 'aggregate_rating', 'votes']
+
+def replicate(df1, rows):
+    '''
+        Replica o dataset até rows linhas, deslocando o restaurant_id de cada cópia para que os ids continuem únicos.
+    '''
+    copies = -(-rows // len(df1))
+    offsets = np.repeat(np.arange(copies, dtype='int64') * 20_000_000, len(df1))
+    df = pd.concat([df1] * copies, ignore_index=True).head(rows)
+
+    return df.assign(restaurant_id=df['restaurant_id'].astype('int64') + offsets[:rows])
+
+def measure(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = replicate(load_dataset(columns=COLUMNS), args.rows)
+
+    print(f"{'consulta':<22}{'linhas':>10}{'sort (s)':>12}{'parcial (s)':>14}{'ganho':>8}")
+    for n in (1, 10, 100):
+        for label, ascending in (('melhores', False), ('piores', True)):
+            full, expected = measure(lambda: df.sort_values(by=['aggregate_rating', 'restaurant_id'],
+                                                            ascending=[ascending, True]).head(n), args.repeat)
+            partial, result = measure(lambda: top_restaurants(df, n, ascending=ascending), args.repeat)
+            pd.testing.assert_frame_equal(result, expected)
+            print(f'{label + " " + str(n):<22}{len(df):>10}{full:>12.4f}{partial:>14.4f}{full / partial:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
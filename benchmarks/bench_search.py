@@ -0,0 +1,66 @@
+'''
+    Compara a busca no índice invertido (fome_zero.search) com a varredura dos textos a cada busca
+    (str.contains em cada coluna), no dataset replicado até --rows linhas. Mostra o tempo de montagem do índice e a
+    latência de cada busca.
+
+    Uso: python benchmarks/bench_search.py [--rows 1000000] [--repeat 5]
+'''
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fome_zero.data import load_dataset
+from fome_zero.search import FIELDS, SearchIndex
+
+QUERIES = ['pizza', 'ital', 'sushi sao paulo', 'mcdonlds', 'connaught place north indian']
+
+def replicate(df1, rows):
+    copies = -(-rows // len(df1))
+    return pd.concat([df1] * copies, ignore_index=True).head(rows)
+
+def measure(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+def scan(df, query):
+    # Varredura: cada palavra da busca precisa aparecer (como substring, sem tratar acentos) em alguma coluna
+    mask = np.ones(len(df), dtype=bool)
+    for term in query.split():
+        found = np.zeros(len(df), dtype=bool)
+        for field in FIELDS:
+            found |= df[field].astype(str).str.contains(term, case=False, regex=False).to_numpy()
+        mask &= found
+
+    return np.flatnonzero(mask)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = replicate(load_dataset(columns=FIELDS + ['restaurant_id', 'aggregate_rating', 'votes']), args.rows)
+    build, index = measure(lambda: SearchIndex(df), 1)
+    print(f'índice de {len(df)} linhas montado em {build:.2f}s ({len(index.vocabulary)} palavras)')
+
+    # A varredura não ignora acentos nem tolera erros de digitação, então as quantidades encontradas podem diferir
+    print(f"{'busca':<32}{'achados':>9}{'varredura (ms)':>16}{'achados':>9}{'índice (ms)':>13}{'ganho':>9}")
+    for query in QUERIES:
+        scanned, expected = measure(lambda: scan(df, query), 1)
+        indexed, (positions, _) = measure(lambda: index.search(query), args.repeat)
+        print(f'{query:<32}{len(expected):>9}{scanned * 1000:>16.0f}{len(positions):>9}{indexed * 1000:>13.2f}'
+              f'{scanned / indexed:>8.0f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+'''
+    Mede, em datasets sintéticos no formato do zomato.csv com --sizes linhas (por padrão 10 mil, 100 mil, 1 milhão e
+    10 milhões), o tempo e o pico de memória de cada etapa do app: data_clean, convert_dataset, a montagem do cubo e
+    das tabelas de campeões, todos os gráficos (plot_*/top_*/hist_*) e consultas (best_*/worst_*/top_*), o filtro de
+    países e a montagem dos marcadores e do html do mapa. Roda sem rede: as taxas de câmbio vêm de rates_fixture.json.
+
+    Cada execução é acrescentada ao histórico (--history, um arquivo json) com o commit, e comparada com a execução
+    anterior das mesmas etapas e tamanhos. Com --max-regression 0.25, termina com erro se alguma etapa ficar mais de
+    25% mais lenta, para uso antes de um commit ou na CI.
+
+    A execução com 1 milhão de linhas usa ~1,5 GB de memória; com 10 milhões, cerca de 10 vezes isso (em máquinas
+    menores, use --sizes 10k,100k,1M).
+
+    Uso: python benchmarks/bench_suite.py [--sizes 10k,100k,1M,10M] [--repeat 3] [--map-rows 1000000]
+                                          [--history benchmarks/history.json] [--max-regression 0.25]
+'''
+import argparse
+import datetime
+import gc
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# As taxas de câmbio vêm sempre da fixture, para que as execuções sejam comparáveis (e sem acesso à rede)
+FIXTURE = Path(__file__).resolve().parent / 'rates_fixture.json'
+os.environ['FOME_ZERO_RATES_FIXTURE'] = str(FIXTURE)
+
+from fome_zero import aggregations, charts
+from fome_zero.champions import build_champions, build_extremes
+from fome_zero.conversion import convert_dataset
+from fome_zero.data import DATASET_PATH, data_clean
+from fome_zero.filters import RowIndex, filter_countries
+from fome_zero.maps import marker_data, render_map
+from fome_zero.rates import get_rates
+from fome_zero.rollup import build_rollup
+
+# Países do filtro medido (os três com mais restaurantes no zomato.csv)
+COUNTRIES = ['India', 'United States of America', 'England']
+
+# Fração de linhas repetidas no dataset sintético, removidas pelo data_clean
+DUPLICATES = 0.01
+
+def parse_size(text):
+    # '10k' -> 10000, '1M' -> 1000000
+    units = {'k': 1_000, 'm': 1_000_000}
+    text = text.strip().lower()
+    return int(float(text[:-1]) * units[text[-1]]) if text[-1] in units else int(text)
+
+def synthetic_dataset(rows, seed=0):
+    '''
+        Dataset bruto (colunas e tipos do zomato.csv) com rows linhas: cada linha copia país, cidade, moeda,
+        culinárias, preço e nota de uma linha sorteada do zomato.csv, com um Restaurant ID novo, coordenadas deslocadas
+        em até ~1 km e outra quantidade de avaliações. Cerca de 1% das linhas repete a anterior. Os textos são os
+        mesmos objetos do zomato.csv, então a memória do dataset cresce com as linhas, e não com o tamanho dos textos.
+    '''
+    rng = np.random.default_rng(seed)
+    source = pd.read_csv(DATASET_PATH).dropna().reset_index(drop=True)
+    pick = rng.integers(0, len(source), rows)
+    ids = np.arange(1, rows + 1, dtype='float64') * 10
+    lat = rng.uniform(-0.01, 0.01, rows)
+    lon = rng.uniform(-0.01, 0.01, rows)
+    votes = rng.integers(0, 5_000, rows)
+
+    # Linhas repetidas: copiam todos os valores sorteados da linha anterior
+    duplicated = np.flatnonzero(rng.random(rows) < DUPLICATES)
+    duplicated = duplicated[duplicated > 0]
+    for values in (pick, ids, lat, lon, votes):
+        values[duplicated] = values[duplicated - 1]
+
+    df0 = source.take(pick).reset_index(drop=True)
+    df0['Restaurant ID'] = ids.astype(source['Restaurant ID'].dtype)
+    df0['Latitude'] = np.clip(df0['Latitude'].to_numpy() + lat, -90, 90)
+    df0['Longitude'] = (df0['Longitude'].to_numpy() + lon + 180) % 360 - 180
+    df0['Votes'] = votes.astype(source['Votes'].dtype)
+
+    return df0
+
+def measure(func, repeat):
+    '''
+        Executa func uma vez sem medir (para tirar da medição os custos de primeira chamada, como os imports e caches
+        internos do plotly), uma vez com o tracemalloc, para o pico de memória alocada, e repeat vezes sem ele, que
+        deixa o código mais lento, para o melhor tempo de parede. Retorna também o resultado.
+    '''
+    func()
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(repeat):
+        del result
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, peak, result
+
+def chart_functions():
+    # Todos os gráficos de fome_zero.charts; os que recebem qtd_top mostram 10 culinárias, como nas páginas
+    functions = []
+    for name, func in inspect.getmembers(charts, inspect.isfunction):
+        if func.__module__ == charts.__name__ and name.startswith(('plot_', 'top_', 'hist_')):
+            args = (10,) if 'qtd_top' in inspect.signature(func).parameters else ()
+            functions.append((name, func, args))
+
+    return functions
+
+def steps(df0, rates, map_rows, state):
+    '''
+        Etapas medidas, na ordem em que o app as executa: (nome, função, chave). O resultado de uma etapa com chave é
+        guardado em state[chave] e usado pelas seguintes.
+    '''
+    yield 'data_clean', lambda: data_clean(df0), 'df1'
+    yield 'convert_dataset', lambda: convert_dataset(state['df1'], rates), None
+    yield 'filter_countries', lambda: filter_countries(state['df1'], COUNTRIES), None
+    yield 'RowIndex', lambda: RowIndex(state['df1']['country']), 'index'
+    yield 'RowIndex.positions', lambda: state['index'].positions(COUNTRIES), None
+    yield 'build_rollup', lambda: build_rollup(state['df1']), 'cube'
+    yield 'Rollup.countries', lambda: state['cube'].countries(COUNTRIES), None
+    yield 'build_champions', lambda: build_champions(state['df1']), 'champions'
+    yield 'build_extremes', lambda: build_extremes(state['df1']), None
+
+    for name, func, args in chart_functions():
+        yield name, lambda func=func, args=args: func(state['cube'], *args), None
+
+    yield 'best_city', lambda: aggregations.best_city(state['cube']), None
+    yield 'best_restaurant', lambda: aggregations.best_restaurant(state['df1']), None
+    yield 'worst_restaurant', lambda: aggregations.worst_restaurant(state['df1']), None
+    yield 'top_rests', lambda: aggregations.top_rests(state['df1'], 10), None
+    yield 'best_per_cuisine', lambda: aggregations.best_per_cuisine(state['champions'].countries(COUNTRIES), 'Italian'), None
+
+    if len(df0) <= map_rows:
+        # Os marcadores viram listas Python e o html do mapa tem ~50 bytes por restaurante: acima de map_rows
+        # (1 milhão de linhas, ~50 MB de html), o mapa não é medido
+        yield 'marker_data', lambda: marker_data(state['df1']), None
+        yield 'render_map', lambda: render_map(state['df1']), None
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return commit + ('-dirty' if dirty else '')
+
+def load_history(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+def previous_results(history):
+    # Último tempo registrado de cada (linhas, etapa)
+    previous = {}
+    for run in history:
+        for result in run['results']:
+            previous[(result['rows'], result['step'])] = result['seconds']
+
+    return previous
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10k,100k,1M,10M')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--map-rows', type=int, default=1_000_000, help='maior dataset em que o mapa é medido')
+    parser.add_argument('--history', default=str(Path(__file__).resolve().parent / 'history.json'))
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='fração de aumento de tempo tolerada em relação à execução anterior (ex.: 0.25)')
+    args = parser.parse_args()
+
+    rates = get_rates()
+    history = load_history(args.history)
+    previous = previous_results(history)
+    results, regressions = [], []
+
+    print(f"{'linhas':>10}  {'etapa':<32}{'tempo (ms)':>12}{'pico (MB)':>12}{'anterior (ms)':>15}{'variação':>10}")
+    for rows in map(parse_size, args.sizes.split(',')):
+        df0 = synthetic_dataset(rows)
+        state = {}
+        for step, func, key in steps(df0, rates, args.map_rows, state):
+            seconds, peak, result = measure(func, args.repeat)
+            if key is not None:
+                state[key] = result
+            del result
+            results.append({'rows': rows, 'step': step, 'seconds': seconds, 'peak_mb': peak / 1e6})
+
+            before = previous.get((rows, step))
+            change = '' if before is None else f'{(seconds / before - 1) * 100:+.0f}%'
+            print(f'{rows:>10}  {step:<32}{seconds * 1000:>12.2f}{peak / 1e6:>12.1f}'
+                  f"{'' if before is None else f'{before * 1000:.2f}':>15}{change:>10}")
+
+            # Etapas abaixo de 1 ms variam demais entre execuções para indicar uma regressão
+            if (args.max_regression is not None and before is not None and max(seconds, before) >= 0.001
+                    and seconds > before * (1 + args.max_regression)):
+                regressions.append((rows, step, before, seconds))
+        del df0, state
+
+    history.append({'commit': git_commit(), 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(), 'pandas': pd.__version__, 'machine': platform.node(),
+                    'repeat': args.repeat, 'results': results})
+    with open(args.history, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+    print(f'resultados acrescentados a {args.history}')
+
+    if regressions:
+        for rows, step, before, seconds in regressions:
+            print(f'regressão: {step} com {rows} linhas passou de {before * 1000:.2f}ms para {seconds * 1000:.2f}ms')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+'''
+    Camada de dados compartilhada pelas páginas do dashboard Fome Zero.
+'''
@@ -0,0 +1,79 @@
+'''
+    Consultas das páginas que retornam valores ou tabelas (e não gráficos): melhor cidade, melhor e pior
+    restaurante, os rankings de restaurantes e as tabelas exibidas nos gráficos de fome_zero.charts.
+'''
+from fome_zero.profiling import timed
+from fome_zero.ranking import top_n, top_restaurants
+
+@timed
+def best_city(cube):
+    dfaux = top_n(cube.mean_by(['city'], 'aggregate_rating'), 1, 'aggregate_rating').reset_index().round(2)
+    city = dfaux.iloc[0,0]
+    rating = dfaux.iloc[0,1]
+    
+    return city, rating
+
+def best_restaurant(df1):
+    dfaux = top_restaurants(df1[['restaurant_id', 'restaurant_name', 'aggregate_rating']], 1)
+    restaurant = dfaux.iloc[0,1]
+    rating = dfaux.iloc[0,2]
+
+    return restaurant, rating
+
+def worst_restaurant(df1):
+    dfaux = top_restaurants(df1[['restaurant_id', 'restaurant_name', 'aggregate_rating']], 1, ascending=True)
+    restaurant = dfaux.iloc[0,1]
+    rating = dfaux.iloc[0,2]
+
+    return restaurant, rating
+
+def country_extremes(extremes, country):
+    # extremes é a tabela de fome_zero.champions.load_extremes: melhor e pior restaurante de cada país
+    row = extremes.loc[country]
+
+    return (row['best_name'], row['best_rating']), (row['worst_name'], row['worst_rating'])
+
+@timed
+def top_rests(df1, qtd_top):
+    dfaux = (top_restaurants(df1, qtd_top).reset_index(drop=True)
+             [['restaurant_name', 'country', 'city', 'cuisines', 'average_cost_for_two', 'aggregate_rating', 'votes']])
+    
+    return dfaux
+
+@timed
+def best_per_cuisine(champions, cuisine):
+    # champions é a tabela de fome_zero.champions para os países selecionados, indexada por cuisines
+    df_cuisine = champions.loc[[cuisine]].reset_index()
+
+    return df_cuisine
+
+# =============
+# TABELAS DOS GRÁFICOS (também servidas pela API, fome_zero.api)
+# =============
+
+def restaurants_per_country(cube):
+    return cube.restaurants_by(['country']).sort_values(by='restaurant_id', ascending=False).reset_index()
+
+def cost_per_country(cube):
+    return cube.mean_by(['country'], 'average_cost_for_two').sort_values(by='average_cost_for_two', ascending=False).reset_index().round(2)
+
+def rating_per_country(cube):
+    return cube.mean_by(['country'], 'aggregate_rating').sort_values(by='aggregate_rating', ascending=False).reset_index().round(2)
+
+def cuisines_per_country(cube):
+    return cube.distinct_by(['country'], 'cuisines').sort_values(by='cuisines', ascending=False).reset_index()
+
+def rating_per_cuisine(cube, qtd_top, ascending=False):
+    # As qtd_top culinárias com as maiores (ou menores, com ascending=True) notas médias
+    return top_n(cube.mean_by(['cuisines'], 'aggregate_rating'), qtd_top, 'aggregate_rating', ascending=ascending).reset_index().round(2)
+
+def rating_per_city(cube):
+    return cube.mean_by(['city'], 'aggregate_rating').sort_values(by='aggregate_rating', ascending=False).reset_index().round(2)
+
+def restaurants_per_city(cube, rating_above=None, rating_below=None):
+    # As 10 cidades com mais restaurantes (opcionalmente, apenas os de nota acima de rating_above ou abaixo de rating_below)
+    dfaux = cube.restaurants_by(['city', 'country'], rating_above=rating_above, rating_below=rating_below)
+    return dfaux.sort_values(by=['restaurant_id','city'], ascending=[False, True]).reset_index().head(10)
+
+def cuisines_per_city(cube):
+    return cube.distinct_by(['city', 'country'], 'cuisines').sort_values(by=['cuisines','city'], ascending=[False, True]).reset_index().head(10)
@@ -0,0 +1,385 @@
+'''
+    API HTTP (JSON) com as mesmas consultas das páginas do dashboard, para outros painéis consumirem os números sem
+    executar o Streamlit. É uma aplicação ASGI (app) sem dependências além das do pacote: um único processo carrega
+    o dataset e os agregados uma vez e atende todas as requisições a partir deles.
+
+    Cada resposta tem um ETag derivado da versão do dataset (e do snapshot de taxas, quando convertida), do caminho e
+    dos parâmetros. O corpo fica em cache pelo ETag, e uma requisição com If-None-Match igual recebe 304 sem que
+    nada seja recalculado; quando o dataset muda, o ETag muda junto.
+
+    Parâmetros aceitos por todas as consultas: countries (lista separada por vírgulas; padrão: todos os países) e
+    currency=USD (valores convertidos). Rotas: ver ROUTES ou GET /api.
+
+    Uso: python -m fome_zero.api [--host 127.0.0.1] [--port 8000] [--server auto|builtin|uvicorn]
+'''
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote
+
+import pandas as pd
+
+from fome_zero.aggregations import (best_city, cost_per_country, cuisines_per_city, cuisines_per_country,
+                                    rating_per_city, rating_per_country, rating_per_cuisine, restaurants_per_city,
+                                    restaurants_per_country, top_rests)
+from fome_zero.cache import LRUCache
+from fome_zero.champions import load_champions
+from fome_zero.conversion import load_converted, snapshot_key
+from fome_zero.data import current_version, load_dataset
+from fome_zero.filters import filter_countries
+from fome_zero.rates import get_rates
+from fome_zero.rollup import load_rollup
+from fome_zero.search import search_index, search_restaurants
+
+logger = logging.getLogger(__name__)
+
+# Colunas do dataset usadas pelas consultas de restaurantes
+COLUMNS = ['restaurant_id', 'restaurant_name', 'country', 'city', 'cuisines', 'all_cuisines', 'average_cost_for_two',
+           'currency', 'aggregate_rating', 'votes']
+
+class BadRequest(ValueError):
+    pass
+
+class Unavailable(RuntimeError):
+    pass
+
+class NotFound(LookupError):
+    pass
+
+# =============
+# PARÂMETROS
+# =============
+
+def _rates(params):
+    # Taxas de câmbio quando a consulta pede valores convertidos, senão None
+    currency = params.get('currency')
+    if currency is None:
+        return None
+    if currency != 'USD':
+        raise BadRequest(f'currency não suportada: {currency} (apenas USD)')
+    rates = get_rates()
+    if rates is None:
+        raise Unavailable('cotações indisponíveis no momento')
+
+    return rates
+
+def _countries(params, cube):
+    if 'countries' not in params:
+        return cube.cells['country'].unique().tolist()
+
+    return [country for country in params['countries'].split(',') if country]
+
+def _int(params, name, default, low=1, high=100):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise BadRequest(f'{name} deve ser um número inteiro') from None
+    if not low <= value <= high:
+        raise BadRequest(f'{name} deve estar entre {low} e {high}')
+
+    return value
+
+def _float(params, name):
+    if name not in params:
+        return None
+    try:
+        return float(params[name])
+    except ValueError:
+        raise BadRequest(f'{name} deve ser um número') from None
+
+def _cube(params):
+    rollup = load_rollup(_rates(params))
+    return rollup.countries(_countries(params, rollup))
+
+def _rows(params):
+    # Linhas do dataset (convertidas, se pedido) dos países selecionados
+    rates = _rates(params)
+    df1 = load_dataset(columns=COLUMNS) if rates is None else load_converted(rates, columns=COLUMNS)
+
+    return filter_countries(df1, _countries(params, load_rollup(rates)))
+
+def _records(frame):
+    return frame.to_dict(orient='records')
+
+# =============
+# CONSULTAS
+# =============
+
+def kpis(params):
+    cube = _cube(params)
+    return {'restaurants': cube.total('restaurants'), 'countries': cube.total('country'), 'cities': cube.total('city'),
+            'votes': cube.total('votes'), 'cuisines': cube.total('cuisines')}
+
+def version(params):
+    # A data das cotações só entra com currency=USD (e então também no ETag)
+    rates = _rates(params)
+    return {'dataset_version': current_version(), 'rates_date': rates['date'] if rates is not None else None}
+
+def countries(params):
+    return load_rollup().cells['country'].unique().tolist()
+
+def best_city_route(params):
+    cube = _cube(params)
+    if cube.cells.empty:
+        raise NotFound('nenhum restaurante nos países selecionados')
+    city, rating = best_city(cube)
+    return {'city': city, 'aggregate_rating': rating}
+
+def cities_restaurants(params):
+    return _records(restaurants_per_city(_cube(params), _float(params, 'rating_above'), _float(params, 'rating_below')))
+
+def cuisines_rating(params):
+    order = params.get('order', 'best')
+    if order not in ('best', 'worst'):
+        raise BadRequest('order deve ser best ou worst')
+
+    return _records(rating_per_cuisine(_cube(params), _int(params, 'n', 10), ascending=order == 'worst'))
+
+def cuisines_champions(params):
+    rates = _rates(params)
+    champions = load_champions(rates).countries(_countries(params, load_rollup(rates)))
+
+    return _records(champions.reset_index())
+
+def restaurants_top(params):
+    return _records(top_rests(_rows(params), _int(params, 'n', 10)))
+
+def restaurants_search(params):
+    if not params.get('q'):
+        raise BadRequest('informe a busca no parâmetro q')
+    rates = _rates(params)
+    df1 = load_dataset(columns=COLUMNS) if rates is None else load_converted(rates, columns=COLUMNS)
+    results, total, elapsed_ms = search_restaurants(df1, params['q'], _countries(params, load_rollup(rates)),
+                                                    limit=_int(params, 'n', 20))
+
+    return {'total': total, 'elapsed_ms': round(elapsed_ms, 3), 'results': _records(results)}
+
+ROUTES = {
+    '/api/version': version,
+    '/api/kpis': kpis,
+    '/api/countries': countries,
+    '/api/countries/restaurants': lambda params: _records(restaurants_per_country(_cube(params))),
+    '/api/countries/cost': lambda params: _records(cost_per_country(_cube(params))),
+    '/api/countries/rating': lambda params: _records(rating_per_country(_cube(params))),
+    '/api/countries/cuisines': lambda params: _records(cuisines_per_country(_cube(params))),
+    '/api/cities/best': best_city_route,
+    '/api/cities/rating': lambda params: _records(rating_per_city(_cube(params))),
+    '/api/cities/restaurants': cities_restaurants,
+    '/api/cities/cuisines': lambda params: _records(cuisines_per_city(_cube(params))),
+    '/api/cuisines/rating': cuisines_rating,
+    '/api/cuisines/champions': cuisines_champions,
+    '/api/restaurants/top': restaurants_top,
+    '/api/restaurants/search': restaurants_search,
+}
+
+# =============
+# RESPOSTAS
+# =============
+
+# Corpos já gerados, pelo ETag (limitado a 2048 respostas e 64 MB)
+_responses = LRUCache(max_entries=2048, max_bytes=64 * 1024 * 1024, sizeof=len)
+
+def _json_default(value):
+    # Escalares do numpy (ex.: int64) e valores do pandas que o json não conhece
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def encode(value):
+    return json.dumps(value, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+def etag(path, params):
+    '''
+        ETag da resposta: muda quando o dataset (ou o snapshot de taxas, para valores convertidos) muda, sem
+        precisar calcular a resposta.
+    '''
+    rates = _rates(params)
+    version_key = (current_version(), None) if rates is None else snapshot_key(rates, params['currency'])
+    digest = hashlib.sha256(repr((version_key, path, sorted(params.items()))).encode('utf-8')).hexdigest()
+
+    return f'"{digest[:32]}"'
+
+async def respond(path, params, if_none_match=None):
+    '''
+        Retorna (status, headers, corpo) da consulta, a partir do cache quando o ETag já foi calculado.
+    '''
+    if path == '/api':
+        return 200, [], encode(sorted(ROUTES) + ['/api/stats'])
+    if path == '/api/stats':
+        return 200, [(b'cache-control', b'no-store')], encode({'responses': _responses.stats()})
+
+    handler = ROUTES.get(path)
+    if handler is None:
+        return 404, [], encode({'error': f'rota inexistente: {path}'})
+
+    try:
+        # O ETag também sai do loop de eventos: current_version() pode recalcular o hash do CSV (e esperar uma
+        # leitura do dataset em outra thread), e get_rates() pode buscar as cotações na rede
+        tag = await asyncio.to_thread(etag, path, params)
+        headers = [(b'etag', tag.encode('ascii')), (b'cache-control', b'no-cache')]
+        if if_none_match is not None and tag in [value.strip() for value in if_none_match.split(',')]:
+            return 304, headers, b''
+
+        body = _responses.get(tag)
+        if body is None:
+            # As consultas usam pandas/numpy: rodam fora do loop de eventos para não bloquear as demais conexões
+            body = encode(await asyncio.to_thread(handler, params))
+            _responses.put(tag, body)
+    except BadRequest as e:
+        return 400, [], encode({'error': str(e)})
+    except NotFound as e:
+        return 404, [], encode({'error': str(e)})
+    except Unavailable as e:
+        return 503, [], encode({'error': str(e)})
+    except Exception:
+        # Qualquer outro erro vira uma resposta 500 em json (e não uma conexão encerrada sem resposta)
+        logger.exception('erro ao responder %s %s', path, params)
+        return 500, [], encode({'error': 'erro interno'})
+
+    return 200, headers, body
+
+async def app(scope, receive, send):
+    '''
+        Aplicação ASGI: GET/HEAD nas rotas de ROUTES. No início (lifespan), carrega o dataset e os agregados.
+    '''
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await asyncio.to_thread(preload)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    start = time.perf_counter()
+    if scope['method'] not in ('GET', 'HEAD'):
+        status, headers, body = 405, [(b'allow', b'GET, HEAD')], encode({'error': 'apenas GET'})
+    else:
+        params = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+        request_headers = dict(scope['headers'])
+        if_none_match = request_headers.get(b'if-none-match')
+        status, headers, body = await respond(scope['path'], params,
+                                              if_none_match.decode('latin-1') if if_none_match is not None else None)
+
+    headers = headers + [(b'content-type', b'application/json; charset=utf-8'),
+                         (b'content-length', str(len(body)).encode('ascii'))]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+    logger.debug('%s %s %d em %.2fms', scope['method'], scope['path'], status, (time.perf_counter() - start) * 1000)
+
+def preload():
+    '''
+        Carrega o dataset, o índice de busca, o cubo e as tabelas de campeões (na moeda original e, se houver
+        cotações, em dólar), para que a primeira requisição de cada consulta não pague por isso.
+    '''
+    start = time.perf_counter()
+    load_dataset(columns=COLUMNS)
+    search_index(current_version())
+    rates = get_rates()
+    for snapshot in (None, rates) if rates is not None else (None,):
+        load_rollup(snapshot)
+        load_champions(snapshot)
+    if rates is not None:
+        load_converted(rates, columns=COLUMNS)
+    logger.info('dataset e agregados carregados em %.2fs', time.perf_counter() - start)
+
+# =============
+# SERVIDOR
+# =============
+
+async def _serve_connection(reader, writer, app):
+    # HTTP/1.1 mínimo (com keep-alive) sobre o asyncio, suficiente para a API e o teste de carga
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            method, target, _ = line.decode('latin-1').split(' ', 2)
+            headers = []
+            while True:
+                header = await reader.readline()
+                if header in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = header.decode('latin-1').partition(':')
+                headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+
+            # A API não lê o corpo da requisição, mas ele precisa ser consumido para a próxima da conexão
+            length = int(dict(headers).get(b'content-length', b'0'))
+            if length:
+                await reader.readexactly(length)
+
+            path, _, query = target.partition('?')
+            scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+                     'scheme': 'http', 'path': unquote(path), 'raw_path': path.encode('latin-1'),
+                     'query_string': query.encode('latin-1'), 'headers': headers,
+                     'client': writer.get_extra_info('peername'), 'server': writer.get_extra_info('sockname')}
+            response = {}
+            body = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    response.update(message)
+                else:
+                    body.append(message.get('body', b''))
+
+            await app(scope, receive, send)
+            status = response['status']
+            lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}']
+            lines += [f"{name.decode('latin-1')}: {value.decode('latin-1')}" for name, value in response.get('headers', [])]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + b''.join(body))
+            await writer.drain()
+
+            if dict(headers).get(b'connection', b'').lower() == b'close':
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(app, host='127.0.0.1', port=8000):
+    '''
+        Servidor HTTP embutido para a aplicação ASGI, usado quando o uvicorn não está instalado.
+    '''
+    await asyncio.to_thread(preload)
+    server = await asyncio.start_server(lambda reader, writer: _serve_connection(reader, writer, app), host, port)
+    logger.info('API em http://%s:%d/api', host, port)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description='API JSON com as consultas do dashboard Fome Zero.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--server', choices=['auto', 'builtin', 'uvicorn'], default='auto',
+                        help='auto usa o uvicorn se ele estiver instalado')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # As respostas são montadas sobre as colunas compartilhadas do dataset em cache; com o copy-on-write, uma escrita
+    # em um DataFrame intermediário gera uma cópia local, sem alterar o cache
+    pd.set_option('mode.copy_on_write', True)
+    if args.server != 'builtin':
+        try:
+            import uvicorn
+        except ImportError:
+            if args.server == 'uvicorn':
+                raise
+        else:
+            uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+            return
+
+    asyncio.run(serve(app, args.host, args.port))
+
+if __name__ == '__main__':
+    main()
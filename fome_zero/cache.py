@@ -0,0 +1,76 @@
+import sys
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+class LRUCache:
+    '''
+        Cache em memória com remoção do item menos usado recentemente (LRU), limitado tanto pela quantidade de itens
+        quanto pelo total de bytes. Seguro para uso pelas várias sessões (threads) do Streamlit.
+    '''
+    def __init__(self, max_entries=32, max_bytes=None, sizeof=sys.getsizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+
+            return self._items[key][0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._items.pop(key)[1]
+            # Um item maior que o limite inteiro do cache não é guardado
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self._bytes += size
+
+            while len(self._items) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_create(self, key, create):
+        '''
+            Retorna o valor guardado para key ou o cria com create() e o guarda. A criação acontece fora do lock,
+            então duas sessões podem eventualmente gerar o mesmo item ao mesmo tempo.
+        '''
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = create()
+            self.put(key, value)
+
+        return value
+
+    def keys(self):
+        '''
+            Chaves guardadas no momento, da menos para a mais usada recentemente.
+        '''
+        with self._lock:
+            return list(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._items), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
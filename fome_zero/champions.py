@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from fome_zero.aggregations import best_restaurant, worst_restaurant
+from fome_zero.cache import LRUCache
+from fome_zero.conversion import load_converted, snapshot_key
+from fome_zero.data import current_version, dataset_version, load_dataset
+from fome_zero.profiling import timed
+from fome_zero.snapshots import load_snapshot
+
+# Colunas do dataset necessárias para exibir o melhor restaurante de cada culinária
+COLUMNS = ['restaurant_id', 'restaurant_name', 'country', 'city', 'cuisines', 'average_cost_for_two', 'currency',
+           'aggregate_rating', 'votes']
+
+def _first_by(frame, keys):
+    # frame já está na ordem do ranking: a primeira linha de cada grupo é o campeão
+    return frame.groupby(keys, observed=True, sort=True).head(1).set_index(keys)
+
+class Champions:
+    '''
+        Melhor restaurante (maior nota, desempate pelo menor restaurant_id) de cada culinária em cada país. O melhor
+        de uma culinária para um conjunto de países é o melhor entre os campeões desses países, então nenhuma
+        consulta precisa voltar a percorrer todos os restaurantes.
+    '''
+    def __init__(self, cells):
+        self.cells = cells
+        self._by_countries = LRUCache(max_entries=16)
+
+    def countries(self, countries):
+        '''
+            Retorna uma tabela com o melhor restaurante de cada culinária, considerando apenas os países selecionados,
+            indexada por cuisines.
+        '''
+        def build():
+            cells = self.cells[self.cells.index.get_level_values('country').isin(countries)].reset_index()
+            return _first_by(_ranked(cells), ['cuisines'])
+
+        return self._by_countries.get_or_create(frozenset(countries), build)
+
+def _ranked(df1):
+    # Ordem do ranking: maior nota primeiro e, nos empates, o menor restaurant_id (uma única ordenação estável)
+    order = np.lexsort((df1['restaurant_id'].to_numpy(), -df1['aggregate_rating'].to_numpy()))
+    return df1.take(order)
+
+@timed
+def build_champions(df1):
+    '''
+        Monta a tabela de campeões por país e culinária com uma única ordenação do dataset e um groupby.
+    '''
+    return Champions(_first_by(_ranked(df1[COLUMNS]), ['country', 'cuisines']))
+
+# Uma tabela por versão do dataset e snapshot de taxas (a versão convertida tem outro average_cost_for_two)
+_champions = LRUCache(max_entries=4)
+
+@timed
+def load_champions(rates=None, to_currency='USD'):
+    '''
+        Retorna a tabela de campeões do dataset na moeda original (rates=None) ou convertido para to_currency,
+        montando-a apenas uma vez por versão do dataset e snapshot de taxas.
+    '''
+    if rates is None:
+        df1 = load_dataset(columns=COLUMNS)
+        key = (dataset_version(), None)
+    else:
+        df1 = load_converted(rates, to_currency, columns=COLUMNS)
+        key = snapshot_key(rates, to_currency)
+
+    return _champions.get_or_create(key, lambda: build_champions(df1))
+
+# Colunas do dataset necessárias para o melhor e o pior restaurante de cada país
+EXTREME_COLUMNS = ['restaurant_id', 'restaurant_name', 'country', 'aggregate_rating']
+
+@timed
+def build_extremes(df1):
+    '''
+        Melhor e pior restaurante de cada país (nome e nota, com o desempate pelo menor restaurant_id), indexados
+        por country. Não depende da moeda, então serve tanto para a moeda original quanto para a convertida.
+    '''
+    rows = []
+    for country, df_country in df1[EXTREME_COLUMNS].groupby('country', observed=True):
+        best_name, best_rating = best_restaurant(df_country)
+        worst_name, worst_rating = worst_restaurant(df_country)
+        rows.append({'country': country, 'best_name': best_name, 'best_rating': best_rating,
+                     'worst_name': worst_name, 'worst_rating': worst_rating})
+
+    return pd.DataFrame(rows)
+
+_extremes = LRUCache(max_entries=2)
+
+@timed
+def load_extremes():
+    '''
+        Retorna a tabela de build_extremes da versão atual do dataset, lida do snapshot em disco quando existir.
+    '''
+    key = (current_version(), None)
+    build = lambda: build_extremes(load_dataset(columns=EXTREME_COLUMNS))
+
+    return _extremes.get_or_create(key, lambda: load_snapshot('extremes', key, build).set_index('country'))
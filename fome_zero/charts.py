@@ -0,0 +1,268 @@
+'''
+    Gráficos das páginas do dashboard, montados a partir do cubo pré-agregado (fome_zero.rollup) com as tabelas de
+    fome_zero.aggregations. O plotly é importado apenas quando o primeiro gráfico é gerado.
+
+    As figuras são montadas direto com graph_objects (o plotly.express refaz validações e agrupamentos a cada figura)
+    e guardadas prontas por gráfico, cubo (versão do dataset, cotação e países) e argumentos: uma nova execução da
+    página com os mesmos filtros reaproveita a figura. As figuras em cache são compartilhadas entre as sessões e não
+    devem ser alteradas por quem as recebe (o st.plotly_chart apenas as serializa).
+'''
+import functools
+
+from fome_zero.aggregations import (cost_per_country, cuisines_per_city, cuisines_per_country, rating_per_city,
+                                    rating_per_country, rating_per_cuisine, restaurants_per_city,
+                                    restaurants_per_country)
+from fome_zero.cache import LRUCache
+from fome_zero.profiling import timed
+
+# A partir desta quantidade de barras, os valores não são escritos sobre cada barra (ficariam ilegíveis e são o
+# que mais pesa para o navegador desenhar): aparecem apenas ao passar o mouse
+LARGE_CATEGORIES = 40
+
+# Figuras prontas, limitadas a 256 figuras e 32 MB (pelo tamanho do json enviado ao navegador)
+FIGURE_CACHE_ENTRIES = 256
+FIGURE_CACHE_BYTES = 32 * 1024 * 1024
+
+_figures = LRUCache(FIGURE_CACHE_ENTRIES, FIGURE_CACHE_BYTES, sizeof=lambda fig: len(figure_json(fig)))
+
+def figure_json(fig):
+    '''
+        Json da figura, no formato enviado ao navegador pelo st.plotly_chart.
+    '''
+    import plotly.io as pio
+
+    return pio.to_json(fig, validate=False)
+
+def cached_figure(build):
+    '''
+        Decorador: guarda a figura montada por build(cube, *args) pela chave do cubo (Rollup.key) e pelos argumentos.
+        Cubos sem chave (montados fora de load_rollup) não usam o cache.
+    '''
+    @functools.wraps(build)
+    def wrapper(cube, *args):
+        if cube.key is None:
+            return build(cube, *args)
+        return _figures.get_or_create((build.__name__, cube.key, args), lambda: build(cube, *args))
+
+    return wrapper
+
+def figure_cache_stats():
+    '''
+        Retorna a quantidade de figuras e bytes em cache, acertos, falhas e remoções.
+    '''
+    return _figures.stats()
+
+def _bar(frame, x, y, text=None, labels=None, color=None, color_continuous_scale=None, color_continuous_midpoint=None):
+    '''
+        Mesmo gráfico que px.bar com esses parâmetros, montado com graph_objects. O texto sobre as barras vem de um
+        texttemplate em vez de uma segunda cópia dos valores, e acima de LARGE_CATEGORIES barras é omitido.
+    '''
+    import plotly.graph_objects as go
+
+    labels = labels or {}
+    label = lambda col: labels.get(col, col)
+    # Assim como no px.bar, o texto e a cor contínua usam os próprios valores de y
+    text_options = {} if text is None or len(frame) > LARGE_CATEGORIES else {'texttemplate': '%{y}', 'textposition': 'auto'}
+    hovertemplate = f'{label(x)}=%{{x}}<br>{label(y)}=%{{y}}<extra></extra>'
+
+    if color is None or color == y:
+        marker = {} if color is None else {'color': frame[y].tolist(), 'coloraxis': 'coloraxis'}
+        traces = [go.Bar(x=frame[x].tolist(), y=frame[y].tolist(), marker=marker, hovertemplate=hovertemplate,
+                         name='', showlegend=False, **text_options)]
+    else:
+        # Uma série por valor de color, na ordem em que aparecem (como no px.bar): as cores vêm do tema
+        traces = [go.Bar(x=group[x].tolist(), y=group[y].tolist(), name=str(value), legendgroup=str(value),
+                         offsetgroup=str(value), alignmentgroup='True', showlegend=True,
+                         hovertemplate=f'{label(color)}={value}<br>' + hovertemplate, **text_options)
+                  for value, group in frame.groupby(color, sort=False, observed=True)]
+
+    fig = go.Figure(traces)
+    fig.update_layout(xaxis_title_text=label(x), yaxis_title_text=label(y), barmode='relative', margin=dict(t=60),
+                      legend=dict(tracegroupgap=0))
+    if color == y:
+        fig.update_layout(coloraxis=dict(colorscale=color_continuous_scale, cmid=color_continuous_midpoint,
+                                         colorbar_title_text=label(y)))
+    elif color is not None and len(frame):
+        fig.update_layout(legend_title_text=label(color))
+
+    return fig
+
+# =============
+# VISÃO PAÍSES
+# =============
+
+@timed
+@cached_figure
+def plot_rest_per_country(cube):
+    rest_per_country = restaurants_per_country(cube)
+    fig = _bar(rest_per_country, x='country', y='restaurant_id', 
+                 text='restaurant_id', 
+                 labels={'country':'País', 'restaurant_id':'Quantidade de Restaurantes'})
+    fig.update_traces(marker_color='#f74846')
+
+    return fig
+
+@timed
+@cached_figure
+def plot_cost_per_country(cube):
+    avg_cost_per_country = cost_per_country(cube)
+    fig = _bar(avg_cost_per_country, x='country', y='average_cost_for_two', 
+                text='average_cost_for_two', 
+                labels={'country':'País', 'average_cost_for_two':'Preço médio do prato para duas pessoas'})
+    fig.update_traces(marker_color='#f74846')
+    
+    return fig
+
+@timed
+@cached_figure
+def plot_rating_per_country(cube):
+    avg_rating_per_country = rating_per_country(cube)
+    fig = _bar(avg_rating_per_country, x='country', y='aggregate_rating', 
+                text='aggregate_rating', 
+                labels={'country':'País', 'aggregate_rating':'Nota média'},
+                color='aggregate_rating',
+                color_continuous_scale='Reds',
+                color_continuous_midpoint=4.3)
+    fig.update_layout(yaxis=dict(range=[0, 5]))
+    
+    return fig
+
+@timed
+@cached_figure
+def plot_cuisines_per_country(cube):
+    cuisine_per_country = cuisines_per_country(cube)
+    fig = _bar(cuisine_per_country, x='country', y='cuisines', 
+                 text='cuisines', 
+                 labels={'country':'País', 'cuisines':'Quantidade de Culinárias Distintas'})
+    fig.update_traces(marker_color='#f74846')
+
+    return fig
+
+@timed
+@cached_figure
+def top_cuisines(cube):
+    dfaux = rating_per_cuisine(cube, 10)
+    fig = _bar(dfaux, x='cuisines', y='aggregate_rating', 
+                text='aggregate_rating', 
+                labels={'cuisines':'Culinária', 'aggregate_rating':'Nota média'},
+                color='aggregate_rating',
+                color_continuous_scale='Reds',
+                color_continuous_midpoint=4.3)
+    fig.update_layout(yaxis=dict(range=[0, 5]))
+    
+    return fig
+
+@timed
+@cached_figure
+def top_cities(cube):
+    dfaux = rating_per_city(cube)
+    fig = _bar(dfaux, x='city', y='aggregate_rating', 
+                text='aggregate_rating', 
+                labels={'city':'Cidade', 'aggregate_rating':'Nota média'},
+                color='aggregate_rating',
+                color_continuous_scale='Reds',
+                color_continuous_midpoint=4.3)
+    fig.update_layout(yaxis=dict(range=[0, 5]))
+    
+    return fig
+
+@timed
+@cached_figure
+def hist_ratings(cube):
+    import plotly.graph_objects as go
+
+    # O cubo guarda quantos restaurantes há em cada décimo de nota: o histograma já chega agrupado ao navegador, uma
+    # barra de 0.1 de largura por décimo, sem que ele precise agrupar as notas
+    dfaux = cube.rating_counts()
+    fig = go.Figure(go.Bar(x=dfaux['aggregate_rating'].tolist(), y=dfaux['count'].tolist(), width=0.1, name='',
+                           showlegend=False, hovertemplate='Nota média=%{x}<br>count=%{y}<extra></extra>'))
+    fig.update_traces(marker_color='#f74846')
+    fig.update_layout(xaxis_title_text='Nota média', yaxis_title_text='count', bargap=0, margin=dict(t=60),
+                      legend=dict(tracegroupgap=0))
+    return fig
+
+
+# =============
+# VISÃO CIDADES
+# =============
+
+@timed
+@cached_figure
+def plot_rest_per_city(cube):
+    rest_per_city = restaurants_per_city(cube)
+    fig = _bar(rest_per_city, x='city', y='restaurant_id', 
+                 text='restaurant_id', 
+                 labels={'city':'Cidade', 'restaurant_id':'Quantidade de Restaurantes', 'country':'País'},
+                 color='country')
+    fig.update_xaxes(categoryorder='total descending')
+
+    return fig
+
+@timed
+@cached_figure
+def plot_above_4(cube):
+    dfaux = restaurants_per_city(cube, rating_above=4)
+    fig = _bar(dfaux, x='city', y='restaurant_id', 
+                 text='restaurant_id', 
+                 labels={'city':'Cidade', 'restaurant_id':'Quantidade de Restaurantes de média acima de 4', 'country':'País'},
+                 color='country')
+    fig.update_xaxes(categoryorder='total descending')
+
+    return fig
+
+@timed
+@cached_figure
+def plot_below_25(cube):
+    dfaux = restaurants_per_city(cube, rating_below=2.5)
+    fig = _bar(dfaux, x='city', y='restaurant_id', 
+                 text='restaurant_id', 
+                 labels={'city':'Cidade', 'restaurant_id':'Quantidade de Restaurantes de média abaixo de 2.5', 'country':'País'},
+                 color='country')
+    fig.update_xaxes(categoryorder='total descending')
+
+    return fig
+
+@timed
+@cached_figure
+def plot_top_cuisines(cube):
+    dfaux = cuisines_per_city(cube)
+    fig = _bar(dfaux, x='city', y='cuisines', 
+                 text='cuisines', 
+                 labels={'city':'Cidade', 'cuisines':'Quantidade de tipos de culinárias únicos', 'country':'País'},
+                 color='country')
+    fig.update_xaxes(categoryorder='total descending')
+
+    return fig
+
+
+# =============
+# VISÃO RESTAURANTES
+# =============
+
+@timed
+@cached_figure
+def plot_rating_per_cuisine(cube, qtd_top):
+    avg_rating_per_country = rating_per_cuisine(cube, qtd_top)
+    fig = _bar(avg_rating_per_country, x='cuisines', y='aggregate_rating', 
+                text='aggregate_rating', 
+                labels={'cuisines':'Culinária', 'aggregate_rating':'Nota média'},
+                color='aggregate_rating',
+                color_continuous_scale='Reds',
+                color_continuous_midpoint=4.3)
+    fig.update_layout(yaxis=dict(range=[0, 5]))
+    
+    return fig
+
+@timed
+@cached_figure
+def plot_worst_rating_per_cuisine(cube, qtd_top):
+    avg_rating_per_country = rating_per_cuisine(cube, qtd_top, ascending=True)
+    fig = _bar(avg_rating_per_country, x='cuisines', y='aggregate_rating', 
+                text='aggregate_rating', 
+                labels={'cuisines':'Culinária', 'aggregate_rating':'Nota média'},
+                color='aggregate_rating',
+                color_continuous_scale='Reds',
+                color_continuous_midpoint=4.3)
+    fig.update_layout(yaxis=dict(range=[0, 5]))
+    
+    return fig
@@ -0,0 +1,114 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from fome_zero.data import dataset_version, load_dataset
+from fome_zero.profiling import timed
+
+# Codificação das moedas do dataset de acordo com os códigos aceitos pela API
+CURRENCY_CODES = {'Botswana Pula(P)':'BWP',
+                  'Brazilian Real(R$)':'BRL',
+                  'Dollar($)':'USD',
+                  'Emirati Diram(AED)':'AED',
+                  'Indian Rupees(Rs.)':'INR',
+                  'Indonesian Rupiah(IDR)':'IDR',
+                  'NewZealand($)':'NZD',
+                  'Pounds(£)':'GBP',
+                  'Qatari Rial(QR)':'QAR',
+                  'Rand(R)':'ZAR',
+                  'Sri Lankan Rupee(LKR)':'LKR',
+                  'Turkish Lira(TL)':'TRY'}
+
+def currency_label(code):
+    '''
+        Retorna o nome da moeda no formato usado pelo dataset (ex.: 'USD' -> 'Dollar($)').
+    '''
+    for label, label_code in CURRENCY_CODES.items():
+        if label_code == code:
+            return label
+
+    return code
+
+def convert_currency(amount, from_currency, rates, to_currency='USD'):
+    '''
+       Essa função vai realizar a conversão de um determinado valor (amount) a partir de uma determinada moeda (from_currency);
+       Como a taxa que obtemos pela API é A PARTIR do dólar, aqui vamos fazer a operação inversa (divisão) para obter a 
+       taxa de conversão PARA o dólar. O parâmetro rates é o json fornecido por fome_zero.rates.get_rates().
+    '''
+    # Salvando a taxa de conversão a partir do json recebido pela API (relativa à moeda de destino)
+    exchange_rate = rates['rates'][from_currency] / rates['rates'][to_currency]
+    # Como a coluna original possuía apenas números inteiros, vamos arredondar para manter também números inteiros
+    converted_amount = round(amount/exchange_rate)
+
+    return converted_amount
+
+def rate_vector(currency, rates, to_currency='USD'):
+    '''
+        Mapeia a coluna de moedas para um vetor de taxas (uma por linha), consultando o json da API apenas uma vez
+        por moeda distinta: cada categoria vira uma posição do vetor e os códigos da categoria indexam esse vetor.
+    '''
+    currency = currency.astype('category')
+    to_rate = rates['rates'][to_currency]
+    per_category = np.array([rates['rates'][CURRENCY_CODES[c]] / to_rate for c in currency.cat.categories], dtype='float64')
+
+    return per_category[currency.cat.codes.to_numpy()]
+
+def convert_costs(df1, rates, to_currency='USD'):
+    '''
+        Converte a coluna average_cost_for_two de todas as linhas para a moeda to_currency de uma só vez,
+        com o mesmo arredondamento (para o par mais próximo) do round() usado em convert_currency.
+    '''
+    amount = df1['average_cost_for_two']
+    converted = np.round(amount.to_numpy() / rate_vector(df1['currency'], rates, to_currency))
+
+    return pd.Series(converted.astype(amount.dtype), index=df1.index, name='average_cost_for_two')
+
+@timed
+def convert_dataset(df1, rates, to_currency='USD'):
+    # Cópia rasa: apenas as duas colunas substituídas ocupam memória nova, as demais continuam as do cache
+    df_converted = df1.copy(deep=False)
+    df_converted['average_cost_for_two'] = convert_costs(df1, rates, to_currency)
+    df_converted['currency'] = pd.Categorical.from_codes(np.zeros(len(df1), dtype='int8'), categories=[currency_label(to_currency)])
+
+    return df_converted
+
+# Colunas convertidas (average_cost_for_two e currency), uma versão por moeda de destino, válidas enquanto o
+# dataset e as taxas não mudarem
+_converted = {}
+_converted_lock = threading.Lock()
+
+CONVERTED_COLUMNS = ['average_cost_for_two', 'currency']
+
+def snapshot_key(rates, to_currency='USD'):
+    '''
+        Identifica a versão convertida do dataset: versão do dataset, moeda de destino e snapshot de taxas (apenas
+        as taxas das moedas presentes no dataset influenciam o resultado).
+    '''
+    codes = sorted(set(CURRENCY_CODES.values()) | {to_currency})
+    return (dataset_version(), to_currency, rates['date'], tuple(rates['rates'][c] for c in codes))
+
+@timed
+def load_converted(rates, to_currency='USD', columns=None):
+    '''
+        Retorna o dataset com os valores convertidos para to_currency. A conversão é feita apenas uma vez por versão
+        do dataset e snapshot de taxas; depois disso, alternar entre a moeda original e a convertida é só uma consulta
+        a este cache. Assim como load_dataset, aceita columns e compartilha as colunas que não mudam.
+    '''
+    df1 = load_dataset(columns=columns)
+    key = snapshot_key(rates, to_currency)
+    replaced = [col for col in CONVERTED_COLUMNS if col in df1.columns]
+    if not replaced:
+        df1.attrs['dataset_key'] = key
+        return df1
+
+    with _converted_lock:
+        cached = _converted.get(to_currency)
+        if cached is None or cached[0] != key:
+            cached = (key, convert_dataset(load_dataset(columns=CONVERTED_COLUMNS), rates, to_currency))
+            _converted[to_currency] = cached
+
+    df_converted = df1.assign(**{col: cached[1][col] for col in replaced})
+    df_converted.attrs['dataset_key'] = key
+
+    return df_converted
@@ -0,0 +1,467 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fome_zero import store
+from fome_zero.profiling import stage, timed
+
+logger = logging.getLogger(__name__)
+
+# Caminho do dataset: um CSV ou um diretório com vários CSVs no mesmo formato (ex.: um arquivo por país)
+DATASET_PATH = Path(os.environ.get('FOME_ZERO_DATASET', Path(__file__).resolve().parent.parent / 'dataset' / 'zomato.csv'))
+
+# Diretório com os arquivos gerados pelo app (snapshot das taxas, dataset em formato colunar, ...)
+CACHE_DIR = Path(os.environ.get('FOME_ZERO_CACHE_DIR', Path(__file__).resolve().parent.parent / '.cache'))
+
+# A partir deste tamanho (em MB), o CSV é limpo em blocos direto para o arquivo colunar (fome_zero.ingest), sem
+# ser carregado inteiro em memória
+STREAMING_MB = int(os.environ.get('FOME_ZERO_STREAMING_MB', 256))
+
+# =============
+# LIMPEZA
+# =============
+
+# Transformando Country Code
+COUNTRIES = {
+1: "India",
+14: "Australia",
+30: "Brazil",
+37: "Canada",
+94: "Indonesia",
+148: "New Zeland",
+162: "Philippines",
+166: "Qatar",
+184: "Singapure",
+189: "South Africa",
+191: "Sri Lanka",
+208: "Turkey",
+214: "United Arab Emirates",
+215: "England",
+216: "United States of America",
+}
+
+# Criando a coluna com o nome das cores
+COLORS = {
+"3F7E00": "darkgreen",
+"5BA829": "green",
+"9ACD32": "lightgreen",
+"CDD614": "orange",
+"FFBA00": "red",
+"CBCBC8": "darkred",
+"FF7800": "darkred",
+}
+
+# Categorizando o price range
+PRICES = {1:'cheap',
+          2:'normal',
+          3:'expensive',
+          4:'gourmet'}
+
+# Tipos numéricos menores que os inferidos pelo read_csv (int64/float64), suficientes para os valores do dataset
+NUMERIC_DTYPES = {'restaurant_id': 'int32',
+                  'average_cost_for_two': 'int32',
+                  'has_table_booking': 'int8',
+                  'has_online_delivery': 'int8',
+                  'is_delivering_now': 'int8',
+                  'votes': 'int32'}
+
+# Versão do data_clean, incluída no hash do dataset: quando a limpeza passa a gerar outras colunas ou tipos, os
+# arquivos colunares e snapshots gerados pela versão anterior deixam de ser usados
+CLEAN_VERSION = 3
+
+# Textos repetidos viram categorias (cada valor distinto guardado uma única vez). Os textos quase únicos por linha
+# (nome e endereço) ficam em colunas de texto do Arrow, em um único buffer, sem um objeto Python por linha.
+CATEGORY_COLUMNS = ['city', 'currency', 'rating_text', 'rating_color', 'locality', 'locality_verbose', 'all_cuisines']
+STRING_COLUMNS = ['restaurant_name', 'address']
+
+# Colunas que nenhuma página exibe nem agrega: com o arquivo colunar, só são lidas quando pedidas explicitamente
+LAZY_COLUMNS = ['address', 'locality', 'locality_verbose']
+
+def _map_categories(series, mapping):
+    '''
+        Aplica mapping apenas aos valores distintos da coluna e devolve o resultado como categoria, evitando percorrer
+        todas as linhas com uma função Python. mapping pode ser um dicionário ou uma função sobre um pd.Index.
+    '''
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Index(uniques)
+    mapped = uniques.map(mapping) if isinstance(mapping, dict) else mapping(uniques)
+
+    missing = uniques[pd.isna(mapped)]
+    if len(missing) > 0:
+        raise KeyError(f'valores sem mapeamento na coluna {series.name}: {list(missing)}')
+
+    # Vários valores originais podem ter o mesmo resultado (ex.: duas cores para "darkred")
+    target = pd.Categorical(mapped)
+
+    return pd.Series(pd.Categorical.from_codes(target.codes[codes], categories=target.categories),
+                     index=series.index, name=series.name)
+
+def _first_cuisine(cuisines):
+    # Mantendo apenas um tipo de "cuisine"
+    return cuisines.str.split(',', n=1).str[0]
+
+@timed
+def data_clean(df0, drop_duplicates=True):
+    '''
+        Limpa o dataset bruto (zomato.csv) sem alterar o DataFrame recebido: remove nulos, duplicados e o outlier de
+        preço, padroniza o nome das colunas, traduz os códigos de país, cor e faixa de preço e reduz os tipos das
+        colunas (categorias para textos repetidos e inteiros menores para os numéricos). Com drop_duplicates=False,
+        as linhas duplicadas já foram removidas por quem chama (ex.: a ingestão em blocos).
+    '''
+    import inflection
+
+    # Linhas nulas, linhas duplicadas e o outlier na coluna average_cost_for_two são removidos com uma única máscara,
+    # copiando as linhas mantidas apenas uma vez
+    keep = df0.notna().all(axis=1) & (df0['Average Cost for two'] != 25000017)
+    if drop_duplicates:
+        keep &= ~df0.duplicated()
+
+    # A coluna "Switch to order menu" possui apenas valores 0
+    df1 = df0.loc[keep, df0.columns.drop('Switch to order menu')]
+
+    # Melhorando o nome das colunas
+    df1.columns = [inflection.underscore(inflection.titleize(x).replace(" ", "")) for x in df1.columns]
+
+    df1 = df1.assign(
+        country_code=_map_categories(df1['country_code'], COUNTRIES),
+        price_range=_map_categories(df1['price_range'], PRICES),
+        cuisines=_map_categories(df1['cuisines'], _first_cuisine),
+        # Lista completa de culinárias do restaurante (ex.: "Italian, Pizza"), usada pela busca
+        all_cuisines=df1['cuisines'],
+        color_nome=_map_categories(df1['rating_color'], COLORS),
+    ).rename(columns={'country_code':'country'})
+
+    # Sem o pyarrow, os textos quase únicos continuam como objetos Python
+    strings = {col: 'string[pyarrow]' for col in STRING_COLUMNS} if store.available() else {}
+    df1 = df1.astype({col: 'category' for col in CATEGORY_COLUMNS} | NUMERIC_DTYPES | strings)
+
+    return df1
+
+def dataset_files(path):
+    '''
+        Arquivos CSV que compõem o dataset: o próprio arquivo ou os *.csv do diretório, em ordem de nome.
+    '''
+    path = Path(path)
+    if not path.is_dir():
+        return [path]
+
+    files = sorted(path.glob('*.csv'))
+    if not files:
+        raise FileNotFoundError(f'nenhum arquivo .csv em {path}')
+
+    return files
+
+@timed
+def read_clean(path):
+    '''
+        Lê e limpa o dataset inteiro em memória. Com um diretório, os arquivos são concatenados em ordem de nome e,
+        como um restaurante pode aparecer em mais de um arquivo, fica apenas a primeira linha de cada restaurant_id.
+    '''
+    if not Path(path).is_dir():
+        with stage('read_csv'):
+            df0 = pd.read_csv(path)
+        return data_clean(df0)
+
+    with stage('read_csv'):
+        df0 = pd.concat([pd.read_csv(file) for file in dataset_files(path)], ignore_index=True)
+    df1 = data_clean(df0)
+    return df1.drop_duplicates('restaurant_id')
+
+# =============
+# CACHE DO DATASET
+# =============
+
+class _DatasetCache:
+    '''
+        Guarda o dataset limpo uma única vez por processo. O Streamlit reexecuta os scripts das páginas a cada
+        interação, mas os módulos importados continuam vivos, então todas as sessões leem deste mesmo objeto.
+        As colunas são carregadas sob demanda a partir do arquivo colunar (fome_zero.store), quando disponível.
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.signature = None
+        # Hash do CSV e versão do dataset (o próprio hash ou, depois de aplicar deltas, um hash derivado dele)
+        self.base_digest = None
+        self.digest = None
+        self.store_file = None
+        self.all_columns = []
+        self.columns = {}
+        self.stats = {'loads': 0, 'store_reads': 0, 'hits': 0, 'deltas': 0, 'last_load_s': None,
+                      'last_store_read_s': None, 'last_hit_s': None, 'last_delta_s': None}
+
+_cache = _DatasetCache()
+
+def file_digest(path):
+    '''
+        Calcula o hash (sha256) do arquivo, usado para identificar a versão do dataset. Para um diretório, o hash
+        cobre o nome e o conteúdo de cada CSV. O hash inclui CLEAN_VERSION, já que o dataset limpo depende também
+        do data_clean.
+    '''
+    h = hashlib.sha256(f'limpeza {CLEAN_VERSION}'.encode('utf-8') + b'\0')
+    for file in dataset_files(path):
+        if file != Path(path):
+            h.update(file.name.encode('utf-8') + b'\0')
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+
+    return h.hexdigest()
+
+def _signature(path):
+    # mtime e tamanho de cada arquivo do dataset (e do manifesto de deltas): se não mudarem, o hash também não muda
+    signature = []
+    for file in dataset_files(path):
+        st_file = os.stat(file)
+        signature.append((file.name, st_file.st_mtime_ns, st_file.st_size))
+    manifest = manifest_path(path)
+    if manifest.exists():
+        st_file = os.stat(manifest)
+        signature.append((manifest.name, st_file.st_mtime_ns, st_file.st_size))
+
+    return tuple(signature)
+
+def manifest_path(path):
+    '''
+        Arquivo que registra a versão do dataset depois dos deltas aplicados sobre o CSV (fome_zero.delta).
+    '''
+    return CACHE_DIR / f'{Path(path).stem}.deltas.json'
+
+def _delta_version(path, digest):
+    # Versão com deltas aplicados sobre o CSV de hash digest, se o arquivo colunar dela existir
+    try:
+        with open(manifest_path(path), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('base') != digest or not store.store_path(CACHE_DIR, path, manifest['version']).exists():
+        return None
+
+    return manifest['version']
+
+def build_store(path=DATASET_PATH, cache_dir=CACHE_DIR, digest=None):
+    '''
+        Lê e limpa o CSV e grava o resultado no formato colunar. Retorna o caminho do arquivo gerado.
+    '''
+    digest = digest or file_digest(path)
+    store_file = store.store_path(cache_dir, path, digest)
+    store.write_store(read_clean(path), store_file)
+
+    return store_file
+
+def _is_fresh(path, signature):
+    # Mesmos arquivos, mesmo mtime e mesmo tamanho: não há necessidade de recalcular o hash
+    return _cache.base_digest is not None and _cache.path == path and _cache.signature == signature
+
+def _open(path, digest, start):
+    # Nova versão do dataset: usa o arquivo colunar se ele já existir, senão limpa o CSV e tenta gerar o arquivo
+    _cache.columns = {}
+    _cache.store_file = None
+    _cache.digest = digest
+    store_file = store.store_path(CACHE_DIR, path, digest)
+
+    version = _delta_version(path, digest) if store.available() else None
+    if version is not None:
+        _cache.digest = version
+        store_file = store.store_path(CACHE_DIR, path, version)
+
+    if store.available() and store_file.exists():
+        _cache.store_file = store_file
+        _cache.all_columns = store.read_schema(store_file)
+        return False
+
+    if store.available() and (path.is_dir() or path.stat().st_size >= STREAMING_MB * 1024 * 1024):
+        # CSV grande ou diretório com vários CSVs: limpos em blocos (e em paralelo, no caso do diretório) direto
+        # para o arquivo colunar, de onde as colunas são lidas sob demanda
+        from fome_zero.ingest import ingest_csv, ingest_shards
+
+        if path.is_dir():
+            ingest_shards(path, store_file)
+        else:
+            ingest_csv(path, store_file)
+        _cache.store_file = store_file
+        _cache.all_columns = store.read_schema(store_file)
+        _cache.stats['loads'] += 1
+        _cache.stats['last_load_s'] = time.perf_counter() - start
+        return True
+
+    frame = read_clean(path).reset_index(drop=True)
+    _cache.all_columns = list(frame.columns)
+    _cache.columns = {col: frame[col] for col in frame.columns}
+
+    if store.available():
+        try:
+            store.write_store(frame, store_file)
+            _cache.store_file = store_file
+            # Gravadas no arquivo colunar, as colunas que nenhuma página usa não precisam ficar em memória
+            for col in LAZY_COLUMNS:
+                _cache.columns.pop(col, None)
+        except OSError as e:
+            logger.warning('não foi possível gravar o dataset em formato colunar: %s', e)
+
+    elapsed = time.perf_counter() - start
+    _cache.stats['loads'] += 1
+    _cache.stats['last_load_s'] = elapsed
+    logger.info('dataset %s lido do CSV e limpo em %.3fs (versão %s)', path.name, elapsed, digest[:12])
+
+    return True
+
+@timed
+def load_dataset(path=DATASET_PATH, columns=None):
+    '''
+        Retorna o dataset limpo, lendo e limpando o CSV apenas quando o arquivo mudar (mtime/tamanho diferentes e
+        hash diferente) e não houver um arquivo colunar gerado para essa versão. Com columns, apenas essas colunas são
+        lidas (uma única vez por processo) e devolvidas. O DataFrame é montado sobre as colunas em cache, sem copiá-las,
+        e deve ser tratado como somente leitura: substituir ou incluir colunas não altera o cache, mas uma escrita no
+        lugar (ex.: df.loc[...] = ...) só fica restrita ao DataFrame com o copy-on-write, ativado pelas páginas e
+        pela API.
+    '''
+    path = Path(path).resolve()
+    start = time.perf_counter()
+    signature = _signature(path)
+
+    with _cache.lock:
+        cold = False
+        if not _is_fresh(path, signature):
+            digest = file_digest(path)
+            if (_cache.path != path or _cache.base_digest != digest
+                    or _delta_version(path, digest) not in (None, _cache.digest)):
+                cold = _open(path, digest, start)
+            # Se apenas o mtime mudou (ex.: arquivo copiado novamente), o conteúdo é o mesmo
+            _cache.path, _cache.base_digest = path, digest
+            _cache.signature = signature
+
+        wanted = _cache.all_columns if columns is None else list(columns)
+        missing = [col for col in wanted if col not in _cache.columns]
+        if missing:
+            read_start = time.perf_counter()
+            projection = store.read_store(_cache.store_file, missing)
+            _cache.columns.update({col: projection[col] for col in missing})
+            elapsed = time.perf_counter() - read_start
+            _cache.stats['store_reads'] += 1
+            _cache.stats['last_store_read_s'] = elapsed
+            logger.info('colunas %s lidas de %s em %.3fs', missing, _cache.store_file.name, elapsed)
+        elif not cold:
+            elapsed = time.perf_counter() - start
+            _cache.stats['hits'] += 1
+            _cache.stats['last_hit_s'] = elapsed
+            logger.debug('dataset %s servido do cache em %.6fs', path.name, elapsed)
+
+        frame = pd.DataFrame({col: _cache.columns[col] for col in wanted}, copy=False)
+        # Identifica de qual versão do dataset (e de qual conversão de moeda) as linhas vieram; usado pelos caches
+        # que dependem das posições das linhas, como os filtros de fome_zero.filters
+        frame.attrs['dataset_key'] = (_cache.digest, None)
+
+        return frame
+
+def align_categories(frames):
+    '''
+        Converte as colunas categóricas dos DataFrames para as mesmas categorias (a união, ordenada como no
+        data_clean), para que possam ser concatenados sem que essas colunas virem texto.
+    '''
+    categorical = [col for col in frames[0].columns if isinstance(frames[0][col].dtype, pd.CategoricalDtype)]
+    dtypes = {col: pd.CategoricalDtype(sorted(set().union(*(frame[col].cat.categories for frame in frames))))
+              for col in categorical}
+
+    return [frame.astype(dtypes) for frame in frames]
+
+def apply_changes(upserts, deleted_ids, delta_digest, path=DATASET_PATH):
+    '''
+        Aplica ao dataset em cache as linhas já limpas de upserts (inclusões e atualizações, pelo restaurant_id) e
+        remove os restaurantes de deleted_ids, sem reler o CSV. Uma atualização fica na posição da linha original e
+        as inclusões vão para o fim. A nova versão do dataset é o hash da versão anterior com o do delta, então os
+        caches identificados pela versão deixam de ser usados; o resultado é gravado no formato colunar (com um
+        manifesto apontando para ele) para valer também para outros processos e depois de um reinício.
+
+        Retorna a versão anterior, a nova versão e as linhas removidas (removed) e adicionadas (added), para que os
+        agregados em cache sejam atualizados apenas onde mudaram.
+    '''
+    path = Path(path).resolve()
+    current = load_dataset(path)
+    start = time.perf_counter()
+
+    with _cache.lock:
+        old_version = _cache.digest
+        if current.attrs['dataset_key'][0] != old_version:
+            raise RuntimeError('o dataset mudou enquanto o delta era aplicado')
+
+        ids = current['restaurant_id']
+        touched = (ids.isin(deleted_ids) | ids.isin(upserts['restaurant_id'])).to_numpy()
+
+        # Posição de cada linha no resultado: as mantidas na ordem atual, as atualizadas no lugar da primeira linha
+        # com o mesmo restaurant_id e as novas no final
+        first = pd.Series(np.arange(len(ids)), index=ids.to_numpy())
+        first = first[~first.index.duplicated()]
+        positions = first.reindex(upserts['restaurant_id'].to_numpy()).to_numpy(dtype='float64', copy=True)
+        inserted = np.isnan(positions)
+        positions[inserted] = len(ids) + np.arange(inserted.sum())
+
+        kept, added = align_categories([current[~touched], upserts.reset_index(drop=True)[list(current.columns)]])
+        order = np.concatenate([np.flatnonzero(~touched), positions])
+        merged = pd.concat([kept, added], ignore_index=True).take(np.argsort(order, kind='stable')).reset_index(drop=True)
+
+        version = hashlib.sha256(f'{old_version}:{delta_digest}'.encode('utf-8')).hexdigest()
+        _cache.digest = version
+        _cache.all_columns = list(merged.columns)
+        _cache.columns = {col: merged[col] for col in merged.columns}
+        _cache.store_file = None
+
+        if store.available() and _cache.base_digest is not None:
+            try:
+                store_file = store.store_path(CACHE_DIR, path, version)
+                store.write_store(merged, store_file)
+                _cache.store_file = store_file
+                for col in LAZY_COLUMNS:
+                    _cache.columns.pop(col, None)
+                tmp = manifest_path(path).with_suffix('.tmp')
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump({'base': _cache.base_digest, 'version': version}, f)
+                os.replace(tmp, manifest_path(path))
+                _cache.signature = _signature(path)
+            except OSError as e:
+                logger.warning('não foi possível gravar o dataset atualizado em formato colunar: %s', e)
+
+        elapsed = time.perf_counter() - start
+        _cache.stats['deltas'] += 1
+        _cache.stats['last_delta_s'] = elapsed
+        logger.info('delta aplicado em %.3fs: %d linhas removidas ou substituídas, %d adicionadas (versão %s)',
+                    elapsed, int(touched.sum()), len(added), version[:12])
+
+    return {'old_version': old_version, 'version': version, 'removed': current[touched].reset_index(drop=True),
+            'added': added}
+
+def current_version(path=DATASET_PATH):
+    '''
+        Confere se o dataset mudou, como load_dataset, e retorna a versão dele sem ler nenhuma coluna (quando já
+        existe o arquivo colunar dessa versão).
+    '''
+    return load_dataset(path, columns=[]).attrs['dataset_key'][0]
+
+def memory_report():
+    '''
+        Bytes ocupados por cada coluna do dataset atualmente em memória no processo (as colunas ainda não lidas do
+        arquivo colunar não aparecem).
+    '''
+    with _cache.lock:
+        return {col: int(series.memory_usage(deep=True, index=False)) for col, series in _cache.columns.items()}
+
+def dataset_version():
+    '''
+        Retorna o hash do dataset atualmente em cache (ou None se nada foi carregado ainda).
+    '''
+    return _cache.digest
+
+def load_stats():
+    '''
+        Retorna quantas leituras completas do CSV, leituras de colunas do arquivo colunar e acertos de cache
+        ocorreram, com a duração da última de cada.
+    '''
+    return dict(_cache.stats)
@@ -0,0 +1,87 @@
+'''
+    Atualização incremental do dataset a partir de um CSV de alterações (delta), sem reler nem limpar novamente o
+    zomato.csv inteiro. O delta tem as colunas do zomato.csv e mais a coluna Operation:
+
+        insert / update   a linha completa do restaurante (um update de um restaurant_id inexistente vira insert)
+        delete            apenas o Restaurant ID é necessário
+
+    Somente as linhas do delta passam pelo data_clean; elas são combinadas ao dataset limpo em cache, a versão do
+    dataset muda e o cubo agregado e os mapas em cache são atualizados apenas nos países, cidades e culinárias
+    alterados.
+
+    Uso: python -m fome_zero.delta caminho/do/delta.csv [--dataset caminho/do/zomato.csv]
+'''
+import argparse
+import logging
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from fome_zero import data, maps, rollup
+from fome_zero.data import DATASET_PATH, data_clean, file_digest
+from fome_zero.ingest import RAW_DTYPES
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = {'insert', 'update', 'delete'}
+
+def read_delta(path):
+    '''
+        Lê o delta e retorna as linhas brutas a incluir ou atualizar e os restaurant_id a remover. Quando um
+        restaurante aparece mais de uma vez, vale a última operação.
+    '''
+    delta = pd.read_csv(path, dtype=RAW_DTYPES | {'Operation': 'object'})
+    if 'Operation' not in delta.columns or 'Restaurant ID' not in delta.columns:
+        raise ValueError(f'{path}: o delta precisa das colunas Restaurant ID e Operation')
+
+    operation = delta['Operation'].str.strip().str.lower()
+    invalid = ~operation.isin(OPERATIONS) | delta['Restaurant ID'].isna()
+    if invalid.any():
+        raise ValueError(f'{path}: linhas {list(delta.index[invalid] + 2)} sem Restaurant ID ou com Operation fora de '
+                         f'{sorted(OPERATIONS)}')
+
+    last = ~delta['Restaurant ID'].duplicated(keep='last')
+    delta, operation = delta[last], operation[last]
+    deleted = operation == 'delete'
+
+    # Um delta só com remoções pode ter apenas as colunas Restaurant ID e Operation
+    missing = [col for col in RAW_DTYPES if col not in delta.columns]
+    if missing and not deleted.all():
+        raise ValueError(f'{path}: colunas {missing} ausentes para as operações insert/update')
+
+    return delta.loc[~deleted].reindex(columns=list(RAW_DTYPES)), delta.loc[deleted, 'Restaurant ID'].astype('int64')
+
+def apply_delta(path, dataset_path=DATASET_PATH):
+    '''
+        Aplica o delta ao dataset em cache e aos agregados que dependem dele, retornando um resumo da atualização.
+        Uma linha incluída ou atualizada que o data_clean descartaria (ex.: com valores nulos) remove o restaurante,
+        deixando o resultado igual ao da limpeza do CSV já com as alterações.
+    '''
+    start = time.perf_counter()
+    upserts, deleted_ids = read_delta(path)
+    # Sem inclusões nem atualizações, as linhas limpas são um DataFrame vazio com as colunas do dataset
+    clean = data_clean(upserts, drop_duplicates=False) if len(upserts) else data.load_dataset(dataset_path).iloc[:0]
+    dropped = upserts['Restaurant ID'][~upserts.index.isin(clean.index)].astype('int64')
+
+    changes = data.apply_changes(clean, pd.concat([deleted_ids, dropped]), file_digest(path), dataset_path)
+    rollup.apply_changes(changes)
+    maps.apply_changes(changes)
+
+    return {'version': changes['version'], 'upserts': len(clean), 'deletes': len(deleted_ids), 'dropped': len(dropped),
+            'rows_removed': len(changes['removed']), 'rows_added': len(changes['added']),
+            'seconds': time.perf_counter() - start}
+
+def main():
+    parser = argparse.ArgumentParser(description='Aplica um CSV de inclusões, atualizações e remoções ao dataset limpo.')
+    parser.add_argument('delta', type=Path, help='CSV com as colunas do zomato.csv e a coluna Operation')
+    parser.add_argument('--dataset', type=Path, default=DATASET_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    stats = apply_delta(args.delta, args.dataset)
+    print(f"delta aplicado em {stats['seconds']:.2f}s: {stats['upserts']} inclusões/atualizações, {stats['deletes']} "
+          f"remoções ({stats['dropped']} linhas descartadas pela limpeza), nova versão {stats['version'][:16]}")
+
+if __name__ == '__main__':
+    main()
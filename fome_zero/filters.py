@@ -0,0 +1,113 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from fome_zero.cache import LRUCache
+from fome_zero.data import load_dataset
+from fome_zero.profiling import timed
+
+class RowIndex:
+    '''
+        Posições das linhas do dataset para cada valor de uma coluna categórica (ex.: country), calculadas uma única
+        vez por versão do dataset. Filtrar por um conjunto de valores vira concatenar as posições já prontas, sem
+        comparar todas as linhas a cada execução da página.
+    '''
+    def __init__(self, series):
+        codes = series.cat.codes.to_numpy()
+        # Ordenação estável: dentro de cada valor as posições continuam em ordem crescente
+        self.order = np.argsort(codes, kind='stable')
+        self.bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(series.cat.categories)))])
+        self.lookup = {value: i for i, value in enumerate(series.cat.categories)}
+        # Linhas com valor nulo (código -1) ficam no início da ordenação e não pertencem a nenhum valor
+        self.offset = int((codes < 0).sum())
+        self.rows = len(series)
+
+    def positions(self, values):
+        '''
+            Posições (em ordem crescente, como no dataset) das linhas com algum dos valores informados.
+        '''
+        slices = [self.order[self.offset + self.bounds[i]:self.offset + self.bounds[i + 1]]
+                  for i in sorted({self.lookup[v] for v in values if v in self.lookup})]
+        if not slices:
+            return np.empty(0, dtype='int64')
+        if len(slices) == 1:
+            return slices[0]
+
+        return np.sort(np.concatenate(slices))
+
+    def __len__(self):
+        return len(self.lookup)
+
+# Um índice por versão do dataset e coluna
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+# Resultados dos filtros mais recentes, por versão do dataset, colunas e valores selecionados
+FILTER_CACHE_ENTRIES = 16
+FILTER_CACHE_BYTES = 128 * 1024 * 1024
+
+_filtered = LRUCache(FILTER_CACHE_ENTRIES, FILTER_CACHE_BYTES,
+                     sizeof=lambda df: int(df.memory_usage(index=True).sum()))
+
+def row_index(column, version):
+    '''
+        Retorna o índice de posições de column para a versão do dataset, montando-o apenas na primeira chamada.
+    '''
+    with _indexes_lock:
+        index = _indexes.get((version, column))
+        if index is None:
+            # Índices de versões antigas do dataset não servem mais
+            for key in [k for k in _indexes if k[0] != version]:
+                del _indexes[key]
+            index = RowIndex(load_dataset(columns=[column])[column])
+            _indexes[(version, column)] = index
+
+    return index
+
+def filter_rows(df1, column, values):
+    '''
+        Equivalente a df1[df1[column].isin(values)], usando o índice de posições quando df1 tem as linhas do dataset
+        completo (como devolvido por load_dataset/load_converted). Quando todos os valores estão selecionados, df1 é
+        devolvido sem cópia; os demais resultados ficam em cache para a mesma seleção.
+    '''
+    dataset_key = df1.attrs.get('dataset_key')
+    values = frozenset(values)
+    if dataset_key is None or not isinstance(df1.index, pd.RangeIndex):
+        return df1[df1[column].isin(values)]
+
+    index = row_index(column, dataset_key[0])
+    if index.rows != len(df1):
+        # Um DataFrame já filtrado herda o attrs, mas não as posições do dataset completo
+        return df1[df1[column].isin(values)]
+    if len(values) >= len(index) and all(v in values for v in index.lookup):
+        return df1
+
+    key = (dataset_key, tuple(df1.columns), column, values)
+    filtered = _filtered.get_or_create(key, lambda: df1.take(index.positions(values)))
+
+    # Cópia rasa: a página pode alterar o DataFrame sem alterar o que está em cache
+    filtered = filtered.copy(deep=False)
+    filtered.attrs.pop('dataset_key', None)
+
+    return filtered
+
+@timed
+def filter_countries(df1, countries):
+    '''
+        Restringe df1 aos restaurantes dos países selecionados.
+    '''
+    return filter_rows(df1, 'country', countries)
+
+@timed
+def filter_cities(df1, cities):
+    '''
+        Restringe df1 aos restaurantes das cidades selecionadas.
+    '''
+    return filter_rows(df1, 'city', cities)
+
+def filter_cache_stats():
+    '''
+        Retorna a quantidade de filtros e bytes em cache, acertos, falhas e remoções.
+    '''
+    return _filtered.stats()
@@ -0,0 +1,154 @@
+'''
+    Índice espacial dos restaurantes por latitude/longitude: uma grade de células de CELL_DEGREES graus, com as
+    linhas do dataset ordenadas pela célula. Uma consulta por retângulo (ex.: a área visível de um mapa) ou por raio
+    em km só compara as linhas das células que a cobrem, em vez de calcular a distância para todos os restaurantes.
+'''
+import threading
+
+import numpy as np
+
+from fome_zero.data import load_dataset
+from fome_zero.profiling import timed
+
+# Raio médio da Terra (km), usado na fórmula de haversine
+EARTH_RADIUS_KM = 6371.0088
+
+# Tamanho de cada célula da grade, em graus (~28 km de latitude)
+CELL_DEGREES = 0.25
+
+# Comprimento de um grau de latitude, em km
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+def haversine_km(lat, lon, lats, lons):
+    '''
+        Distância (em km, pela superfície da Terra) entre o ponto (lat, lon) e cada ponto de (lats, lons).
+    '''
+    lat, lon, lats, lons = (np.radians(v) for v in (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class GridIndex:
+    '''
+        Posições das linhas do dataset agrupadas pela célula da grade onde cada restaurante está. As células de uma
+        mesma faixa de latitude são numeradas em sequência, então os restaurantes de um intervalo de longitudes em
+        uma faixa são um trecho contínuo das posições ordenadas.
+    '''
+    def __init__(self, latitude, longitude, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.rows_count = int(round(180 / cell_degrees))
+        self.cols_count = int(round(360 / cell_degrees))
+        self.lat = np.asarray(latitude, dtype='float64')
+        self.lon = np.asarray(longitude, dtype='float64')
+
+        cells = self._row(self.lat) * self.cols_count + self._col(self.lon)
+        self.order = np.argsort(cells, kind='stable')
+        self.cells = cells[self.order]
+        self.rows = len(self.lat)
+
+    def _row(self, lat):
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_degrees), 0, self.rows_count - 1).astype('int64')
+
+    def _col(self, lon):
+        return np.clip(np.floor((np.asarray(lon) + 180) / self.cell_degrees), 0, self.cols_count - 1).astype('int64')
+
+    def _spans(self, south, west, north, east):
+        # Trechos (início, fim) das posições ordenadas com as células que cobrem o retângulo
+        rows = np.arange(self._row(south), self._row(north) + 1)
+        if west <= east:
+            cols = [(self._col(west), self._col(east))]
+        else:
+            # Retângulo que atravessa o antimeridiano (180°): dois intervalos de longitude
+            cols = [(self._col(west), self.cols_count - 1), (0, self._col(east))]
+
+        starts = np.concatenate([np.searchsorted(self.cells, rows * self.cols_count + first, side='left') for first, _ in cols])
+        ends = np.concatenate([np.searchsorted(self.cells, rows * self.cols_count + last, side='right') for _, last in cols])
+
+        return starts, ends
+
+    def _candidates(self, starts, ends):
+        # Posições das linhas nas células (algumas ficam fora do retângulo, nas bordas das células)
+        slices = [self.order[start:end] for start, end in zip(starts, ends) if end > start]
+
+        return np.concatenate(slices) if slices else np.empty(0, dtype='int64')
+
+    @staticmethod
+    def _inside(lat, lon, south, west, north, east):
+        inside = (lat >= south) & (lat <= north)
+        return inside & (((lon >= west) & (lon <= east)) if west <= east else ((lon >= west) | (lon <= east)))
+
+    def within_box(self, south, west, north, east):
+        '''
+            Posições (em ordem crescente, como no dataset) dos restaurantes dentro do retângulo, como a área visível
+            de um mapa. Com west > east, o retângulo atravessa o antimeridiano.
+        '''
+        starts, ends = self._spans(south, west, north, east)
+        if (ends - starts).sum() > self.rows // 4:
+            # Retângulo com boa parte dos restaurantes: comparar todas as linhas sai mais barato que juntar as células
+            return np.flatnonzero(self._inside(self.lat, self.lon, south, west, north, east))
+
+        positions = self._candidates(starts, ends)
+        inside = self._inside(self.lat[positions], self.lon[positions], south, west, north, east)
+
+        return np.sort(positions[inside])
+
+    def nearby(self, lat, lon, radius_km):
+        '''
+            Posições dos restaurantes a até radius_km do ponto (lat, lon) e as distâncias em km, da mais próxima para
+            a mais distante.
+        '''
+        dlat = radius_km / KM_PER_DEGREE
+        south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        # Perto dos polos o raio cobre todas as longitudes
+        cos_lat = np.cos(np.radians(max(abs(south), abs(north))))
+        dlon = 180.0 if cos_lat < 1e-9 else radius_km / (KM_PER_DEGREE * cos_lat)
+        if dlon >= 180.0:
+            west, east = -180.0, 180.0
+        else:
+            west, east = (lon - dlon + 180) % 360 - 180, (lon + dlon + 180) % 360 - 180
+
+        positions = self._candidates(*self._spans(south, west, north, east))
+        distances = haversine_km(lat, lon, self.lat[positions], self.lon[positions])
+        near = distances <= radius_km
+        positions, distances = positions[near], distances[near]
+        # Desempate pela posição no dataset, para que o resultado não dependa da ordem das células
+        order = np.lexsort((positions, distances))
+
+        return positions[order], distances[order]
+
+# Um índice por versão do dataset, montado na primeira consulta
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def spatial_index(version):
+    '''
+        Retorna o índice espacial da versão do dataset, montando-o apenas na primeira chamada.
+    '''
+    with _indexes_lock:
+        index = _indexes.get(version)
+        if index is None:
+            # Índices de versões antigas do dataset não servem mais
+            _indexes.clear()
+            coords = load_dataset(columns=['latitude', 'longitude'])
+            index = GridIndex(coords['latitude'].to_numpy(), coords['longitude'].to_numpy())
+            _indexes[version] = index
+
+    return index
+
+def _index_for(df1):
+    # Assim como em fome_zero.filters, as posições do índice só valem para o dataset completo
+    dataset_key = df1.attrs.get('dataset_key')
+    if dataset_key is None or len(df1) != spatial_index(dataset_key[0]).rows:
+        raise ValueError('a consulta espacial precisa do dataset completo (load_dataset ou load_converted)')
+
+    return spatial_index(dataset_key[0])
+
+@timed
+def nearby_restaurants(df1, lat, lon, radius_km):
+    '''
+        Restaurantes de df1 (o dataset completo) a até radius_km do ponto (lat, lon), do mais próximo para o mais
+        distante, com a distância na coluna distance_km.
+    '''
+    positions, distances = _index_for(df1).nearby(lat, lon, radius_km)
+
+    return df1.take(positions).assign(distance_km=distances.round(2))
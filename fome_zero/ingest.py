@@ -0,0 +1,220 @@
+'''
+    Ingestão em lotes de arquivos CSV no formato do zomato.csv que não cabem (ou não deveriam ser carregados
+    inteiros) em memória. O CSV é lido em blocos de linhas, cada bloco passa pelo data_clean e é gravado no
+    armazenamento colunar (fome_zero.store); a memória usada depende do tamanho do bloco, e não do arquivo.
+
+    Um diretório com vários CSVs (ex.: um por país) é ingerido em paralelo, um arquivo por processo, e os
+    restaurantes repetidos entre arquivos são removidos pelo restaurant_id.
+
+    Uso: python -m fome_zero.ingest caminho/do/arquivo.csv|caminho/do/diretorio [--chunksize 200000] [--workers N]
+'''
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fome_zero import store
+from fome_zero.data import CACHE_DIR, data_clean, dataset_files, file_digest
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas do CSV por bloco
+CHUNK_ROWS = 200_000
+
+# Os tipos das colunas são fixos, e não inferidos bloco a bloco: um bloco com valores nulos em uma coluna inteira
+# (ou com uma coluna de texto toda nula) teria outro tipo e outro hash para as mesmas linhas. As numéricas são
+# lidas como float64 e data_clean converte os tipos depois.
+RAW_DTYPES = {col: 'float64' for col in ['Restaurant ID', 'Country Code', 'Longitude', 'Latitude', 'Average Cost for two',
+                                         'Has Table booking', 'Has Online delivery', 'Is delivering now',
+                                         'Switch to order menu', 'Price range', 'Aggregate rating', 'Votes']}
+RAW_DTYPES |= {col: 'object' for col in ['Restaurant Name', 'City', 'Address', 'Locality', 'Locality Verbose',
+                                         'Cuisines', 'Currency', 'Rating color', 'Rating text']}
+
+class SeenKeys:
+    '''
+        Conjunto das chaves de 64 bits já vistas (o hash de cada linha ou o restaurant_id), guardado como um array
+        ordenado: 8 bytes por chave, sem um objeto Python por linha. Cada bloco é comparado por busca binária e
+        depois intercalado ao array.
+    '''
+    def __init__(self):
+        self.hashes = np.empty(0, dtype='uint64')
+
+    def add(self, hashes):
+        '''
+            Registra as chaves do bloco e retorna a máscara das linhas que aparecem pela primeira vez (nem em
+            blocos anteriores, nem antes no próprio bloco).
+        '''
+        found = np.zeros(len(hashes), dtype=bool)
+        if len(self.hashes):
+            pos = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            found = self.hashes[pos] == hashes
+        new = ~found & ~pd.Series(hashes).duplicated().to_numpy()
+
+        # Os dois lados já estão ordenados: a ordenação estável (timsort) apenas intercala as duas sequências
+        self.hashes = np.sort(np.concatenate([self.hashes, np.sort(hashes[new])]), kind='stable')
+
+        return new
+
+    def __len__(self):
+        return len(self.hashes)
+
+def row_hashes(chunk):
+    return pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+def read_chunks(path, chunksize=CHUNK_ROWS):
+    '''
+        Lê o CSV em blocos de chunksize linhas, com tipos fixos para as colunas.
+    '''
+    return pd.read_csv(path, chunksize=chunksize, dtype=RAW_DTYPES)
+
+def clean_chunks(chunks, seen, stats):
+    '''
+        Aplica o data_clean a cada bloco, removendo antes as linhas repetidas de blocos anteriores (o data_clean só
+        enxerga as repetições dentro do próprio bloco). As colunas categóricas saem como texto, pois as categorias
+        de cada bloco são diferentes; as categorias encontradas são acumuladas em stats['categories'].
+    '''
+    for chunk in chunks:
+        start = time.perf_counter()
+        new = seen.add(row_hashes(chunk))
+        clean = data_clean(chunk[new], drop_duplicates=False)
+
+        categorical = [col for col in clean.columns if isinstance(clean[col].dtype, pd.CategoricalDtype)]
+        for col in categorical:
+            stats['categories'].setdefault(col, set()).update(clean[col].cat.categories)
+
+        stats['chunks'] += 1
+        stats['rows_read'] += len(chunk)
+        stats['duplicates'] += int((~new).sum())
+        stats['rows_written'] += len(clean)
+        logger.info('bloco %d: %d linhas lidas, %d mantidas em %.3fs', stats['chunks'], len(chunk), len(clean),
+                    time.perf_counter() - start)
+
+        yield clean.astype({col: object for col in categorical})
+
+def categorize(frames, categories):
+    '''
+        Converte de volta para categorias as colunas de texto, com as mesmas categorias (ordenadas, como no
+        data_clean do arquivo inteiro) em todos os lotes.
+    '''
+    dtypes = {col: pd.CategoricalDtype(sorted(values)) for col, values in categories.items()}
+    for frame in frames:
+        yield frame.astype(dtypes)
+
+def ingest_csv(path, store_file, chunksize=CHUNK_ROWS):
+    '''
+        Limpa o CSV em blocos e grava o resultado em store_file, com o mesmo conteúdo que
+        store.write_store(data_clean(pd.read_csv(path))) geraria. As categorias só são conhecidas depois de ler o
+        arquivo inteiro, então os blocos limpos passam por um arquivo temporário (com as categorias como texto) e
+        são regravados com as categorias finais. Retorna as estatísticas da ingestão.
+    '''
+    store_file = Path(store_file)
+    parts = store_file.with_suffix('.parts')
+    stats = {'chunks': 0, 'rows_read': 0, 'duplicates': 0, 'rows_written': 0, 'categories': {}}
+    start = time.perf_counter()
+
+    try:
+        store.write_batches(clean_chunks(read_chunks(path, chunksize), SeenKeys(), stats), parts)
+        store.write_batches(categorize(store.read_batches(parts), stats['categories']), store_file)
+    finally:
+        parts.unlink(missing_ok=True)
+    store.remove_old_versions(store_file)
+
+    stats['seconds'] = time.perf_counter() - start
+    del stats['categories']
+    logger.info('%s ingerido em %.1fs: %d linhas lidas, %d repetidas, %d gravadas em %s', Path(path).name,
+                stats['seconds'], stats['rows_read'], stats['duplicates'], stats['rows_written'], store_file.name)
+
+    return stats
+
+def _clean_shard(path, parts, chunksize):
+    # Executada em um processo do pool: limpa um arquivo em blocos e grava o resultado (categorias como texto)
+    start = time.perf_counter()
+    stats = {'chunks': 0, 'rows_read': 0, 'duplicates': 0, 'rows_written': 0, 'categories': {}}
+    store.write_batches(clean_chunks(read_chunks(path, chunksize), SeenKeys(), stats), parts)
+    stats['seconds'] = time.perf_counter() - start
+
+    return stats
+
+def unique_restaurants(frames, seen, stats):
+    '''
+        Mantém apenas a primeira linha de cada restaurant_id, considerando todos os lotes já vistos.
+    '''
+    for frame in frames:
+        new = seen.add(frame['restaurant_id'].to_numpy().astype('uint64'))
+        stats['duplicates'] += int((~new).sum())
+        yield frame[new]
+
+def ingest_shards(directory, store_file, workers=None, chunksize=CHUNK_ROWS):
+    '''
+        Limpa os CSVs do diretório em paralelo (um por processo, cada um lido em blocos) e grava o resultado em
+        store_file, na ordem de nome dos arquivos e com apenas a primeira linha de cada restaurant_id. Retorna as
+        estatísticas da ingestão, com o tempo e a vazão (linhas/s) de cada arquivo em stats['shards'].
+    '''
+    files = dataset_files(directory)
+    store_file = Path(store_file)
+    parts = [store_file.with_name(f'{store_file.stem}.{i:04d}.parts') for i in range(len(files))]
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    results = [None] * len(files)
+    start = time.perf_counter()
+
+    try:
+        # spawn: o processo do Streamlit tem threads, e um fork copiaria o estado delas
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {pool.submit(_clean_shard, file, part, chunksize): i for i, (file, part) in enumerate(zip(files, parts))}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                results[i] = shard = future.result()
+                logger.info('[%d/%d] %s: %d linhas lidas, %d mantidas em %.2fs (%.0f linhas/s)', done, len(files),
+                            files[i].name, shard['rows_read'], shard['rows_written'], shard['seconds'],
+                            shard['rows_read'] / shard['seconds'])
+
+        categories = {}
+        for shard in results:
+            for col, values in shard.pop('categories').items():
+                categories.setdefault(col, set()).update(values)
+
+        stats = {'shards': {file.name: shard for file, shard in zip(files, results)}, 'workers': workers,
+                 'rows_read': sum(shard['rows_read'] for shard in results),
+                 'duplicates': sum(shard['duplicates'] for shard in results)}
+        frames = (frame for part in parts for frame in store.read_batches(part))
+        stats['rows_written'] = store.write_batches(categorize(unique_restaurants(frames, SeenKeys(), stats), categories),
+                                                    store_file)
+    finally:
+        for part in parts:
+            part.unlink(missing_ok=True)
+    store.remove_old_versions(store_file)
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['rows_per_s'] = stats['rows_read'] / stats['seconds']
+    logger.info('%d arquivos de %s ingeridos em %.1fs com %d processos (%.0f linhas/s): %d linhas lidas, %d repetidas, '
+                '%d gravadas em %s', len(files), Path(directory).name, stats['seconds'], workers, stats['rows_per_s'],
+                stats['rows_read'], stats['duplicates'], stats['rows_written'], store_file.name)
+
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera o arquivo colunar a partir de um CSV grande, lido em blocos, '
+                                                 'ou de um diretório de CSVs, processados em paralelo.')
+    parser.add_argument('source', type=Path, help='arquivo CSV ou diretório com arquivos CSV')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=None, help='processos usados para um diretório (padrão: CPUs)')
+    parser.add_argument('--cache-dir', type=Path, default=CACHE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    store_file = store.store_path(args.cache_dir, args.source, file_digest(args.source))
+    if args.source.is_dir():
+        stats = ingest_shards(args.source, store_file, args.workers, args.chunksize)
+    else:
+        stats = ingest_csv(args.source, store_file, args.chunksize)
+    print(f"{store_file} gerado: {stats['rows_written']} linhas ({stats['duplicates']} repetidas removidas) "
+          f"em {stats['seconds']:.1f}s ({stats['rows_read'] / stats['seconds']:.0f} linhas/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import functools
+import json
+
+import numpy as np
+from jinja2 import Template
+
+from fome_zero.cache import LRUCache
+from fome_zero.data import dataset_version
+from fome_zero.profiling import timed
+
+# Os restaurantes são enviados ao navegador por coluna (uma lista por campo), o que deixa o html menor que uma
+# lista por restaurante. Os textos repetidos (cor, culinária e moeda) vão em tabelas separadas e as colunas guardam
+# apenas a posição de cada valor nelas.
+MARKER_CALLBACK = '''
+var icons = {};
+function escapeHtml(text) {
+    return String(text).replace(/[&<>"']/g, function(c) {
+        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+    });
+}
+function callback(data, i) {
+    var color = data.colors[data.color[i]];
+    if (!(color in icons)) {
+        icons[color] = L.AwesomeMarkers.icon({icon: 'utensils', prefix: 'fa', markerColor: color,
+                                              iconColor: 'white', extraClasses: 'fa-rotate-0'});
+    }
+    var marker = L.marker([data.lat[i], data.lon[i]], {icon: icons[color]});
+    // O conteúdo do popup só é montado quando o marcador é clicado
+    marker.bindPopup(function() {
+        return '<h5> <b> ' + escapeHtml(data.name[i]) + ' </b> </h5> <br>' +
+               'Cozinha: ' + escapeHtml(data.cuisines[data.cuisine[i]]) + ' <br>' +
+               'Preço médio para dois: ' + data.cost[i] + ' (' + escapeHtml(data.currencies[data.currency[i]]) + ') <br>' +
+               'Avaliação: ' + data.rating[i].toFixed(1) + ' / 5.0 <br>';
+    }, {maxWidth: 500});
+    return marker;
+}
+'''
+
+@functools.cache
+def _cluster_class():
+    # O folium (e suas dependências) só é importado quando o primeiro mapa é gerado
+    from folium.plugins import MarkerCluster
+
+    class CompactMarkerCluster(MarkerCluster):
+        '''
+            Cluster de marcadores criado no navegador a partir de listas compactas (como o FastMarkerCluster do folium),
+            mas com os dados já serializados em json: não há validação linha a linha em Python e os marcadores são
+            adicionados ao cluster de uma vez (chunkedLoading).
+
+            O folium/branca recompila como template jinja todo o script gerado, o que fica muito lento com milhares de
+            linhas. Por isso o template recebe apenas um marcador de posição, substituído pelos dados em fill_data().
+        '''
+        _template = Template("""
+            {% macro script(this, kwargs) %}
+                var {{ this.get_name() }} = (function(){
+                    {{ this.callback }}
+                    var data = {{ this.placeholder }};
+                    var cluster = L.markerClusterGroup({{ this.options|tojson }});
+                    var markers = new Array(data.lat.length);
+                    for (var i = 0; i < markers.length; i++) {
+                        markers[i] = callback(data, i);
+                    }
+                    cluster.addLayers(markers);
+                    cluster.addTo({{ this._parent.get_name() }});
+                    return cluster;
+                })();
+            {% endmacro %}""")
+
+        def __init__(self, data, callback, **options):
+            super().__init__(**options)
+            self._name = 'CompactMarkerCluster'
+            self.callback = callback
+            # "</" é escapado para que nenhum nome de restaurante consiga fechar a tag <script>
+            self.data_json = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+            self.placeholder = f'/*{self.get_name()}_data*/{{"lat":[]}}'
+
+        def fill_data(self, html):
+            return html.replace(self.placeholder, self.data_json, 1)
+
+    return CompactMarkerCluster
+
+def __getattr__(name):
+    # fome_zero.maps.CompactMarkerCluster continua disponível, criado sob demanda
+    if name == 'CompactMarkerCluster':
+        return _cluster_class()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def _codes(series):
+    # Posição de cada valor na tabela de valores distintos da coluna
+    series = series.astype('category').cat.remove_unused_categories()
+    return series.cat.codes.to_numpy().tolist(), [str(c) for c in series.cat.categories]
+
+def marker_data(df1):
+    '''
+        Monta as colunas compactas dos marcadores e as tabelas de textos repetidos usadas pelo callback JavaScript,
+        sem iterar linha a linha no pandas.
+    '''
+    color, colors = _codes(df1['color_nome'])
+    cuisine, cuisines = _codes(df1['cuisines'])
+    currency, currencies = _codes(df1['currency'])
+
+    # 5 casas decimais (~1 metro) são suficientes para posicionar o marcador e reduzem o tamanho do html
+    return {'lat': np.round(df1['latitude'].to_numpy(), 5).tolist(),
+            'lon': np.round(df1['longitude'].to_numpy(), 5).tolist(),
+            'color': color, 'colors': colors,
+            'cuisine': cuisine, 'cuisines': cuisines,
+            'cost': df1['average_cost_for_two'].to_numpy().tolist(),
+            'currency': currency, 'currencies': currencies,
+            'rating': df1['aggregate_rating'].to_numpy().tolist(),
+            'name': df1['restaurant_name'].astype(str).tolist()}
+
+@timed
+def render_map(df1, bounds=None):
+    '''
+        Gera o html do mapa com os restaurantes agrupados em clusters no navegador (CompactMarkerCluster), no mesmo
+        formato que o folium_static envia para o Streamlit. Com bounds ([[sul, oeste], [norte, leste]]), o mapa abre
+        enquadrado nessa área.
+    '''
+    import folium
+
+    map = folium.Map()
+    if bounds is not None:
+        map.fit_bounds(bounds)
+    cluster = _cluster_class()(marker_data(df1), MARKER_CALLBACK, chunkedLoading=True)
+    cluster.add_to(map)
+
+    return cluster.fill_data(folium.Figure().add_child(map).render())
+
+# html já gerado para cada combinação de filtros (limitado a 32 mapas e 64 MB)
+MAP_CACHE_ENTRIES = 32
+MAP_CACHE_BYTES = 64 * 1024 * 1024
+
+_rendered = LRUCache(MAP_CACHE_ENTRIES, MAP_CACHE_BYTES, sizeof=lambda html: len(html.encode('utf-8')))
+
+def map_key(countries, converter, rates_date, version=None):
+    '''
+        Chave do mapa no cache: versão do dataset, países selecionados (sem importar a ordem), conversão de moeda
+        ligada/desligada e data da cotação usada na conversão.
+    '''
+    return (version or dataset_version(), tuple(sorted(countries)), bool(converter), rates_date if converter else None)
+
+@timed
+def cached_map(key, df1, bounds=None):
+    '''
+        Retorna o html do mapa para o estado de filtros key (ver map_key), gerando-o apenas quando ele não estiver
+        no cache.
+    '''
+    return _rendered.get_or_create(key, lambda: render_map(df1, bounds))
+
+def map_cache_stats():
+    '''
+        Retorna a quantidade de mapas e bytes em cache, acertos, falhas e remoções.
+    '''
+    return _rendered.stats()
+
+def apply_changes(changes):
+    '''
+        Depois de um delta do dataset (fome_zero.data.apply_changes), mantém no cache os mapas da versão anterior
+        cuja seleção de países não inclui nenhum país alterado, agora com a nova versão: apenas os mapas que
+        mostram restaurantes removidos, atualizados ou incluídos precisam ser gerados novamente.
+    '''
+    affected = set(changes['removed']['country']) | set(changes['added']['country'])
+    for key in _rendered.keys():
+        if key[0] == changes['old_version'] and affected.isdisjoint(key[1]):
+            html = _rendered.get(key)
+            if html is not None:
+                _rendered.put((changes['version'],) + key[1:], html)
@@ -0,0 +1,215 @@
+'''
+    Medição do tempo de cada etapa de uma execução (rerun) das páginas: leitura e limpeza do dataset, cotações,
+    conversão, filtros, cada gráfico e cada renderização. As funções do pacote marcadas com @timed e os trechos das
+    páginas dentro de stage() viram etapas da execução atual, aninhadas quando uma chama a outra; fora de uma execução
+    (API, benchmarks, CLIs), não medem nada.
+
+    Ao fim de cada execução, as etapas são registradas no log em json (logger fome_zero.profiling). Com ?debug=1 na
+    URL ou FOME_ZERO_DEBUG=1, a barra lateral mostra a cascata da execução e permite perfilar (cProfile, ou o
+    pyinstrument se estiver instalado) uma execução e baixar o resultado.
+'''
+import contextlib
+import functools
+import importlib.util
+import io
+import json
+import logging
+import marshal
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Variável de ambiente que liga o painel de depuração em todas as sessões (senão, apenas com ?debug=1 na URL)
+DEBUG_ENV = 'FOME_ZERO_DEBUG'
+
+# Chaves do st.session_state: perfilador pedido para a próxima execução e o perfil da última execução perfilada
+PROFILE_REQUEST_KEY = 'fome_zero_profile_request'
+PROFILE_RESULT_KEY = 'fome_zero_profile_result'
+
+# Cada sessão do Streamlit executa a página em uma thread própria: a execução em andamento fica por thread
+_local = threading.local()
+
+class Rerun:
+    '''
+        Etapas de uma execução da página: (nome, início e duração em segundos, profundidade), na ordem em que
+        terminaram.
+    '''
+    def __init__(self, page):
+        self.page = page
+        self.start = time.perf_counter()
+        self.stages = []
+        self.depth = 0
+        self.total = None
+        self.profiler = None
+
+    def records(self):
+        # Etapas na ordem em que começaram (uma etapa aninhada termina antes da que a contém)
+        return [{'stage': name, 'start_ms': round(start * 1000, 3), 'ms': round(elapsed * 1000, 3), 'depth': depth}
+                for name, start, elapsed, depth in sorted(self.stages, key=lambda s: (s[1], s[3]))]
+
+def current_rerun():
+    return getattr(_local, 'rerun', None)
+
+@contextlib.contextmanager
+def stage(name):
+    '''
+        Mede o trecho como uma etapa da execução atual (sem efeito fora de uma execução).
+    '''
+    rerun = current_rerun()
+    if rerun is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    rerun.depth += 1
+    try:
+        yield
+    finally:
+        rerun.depth -= 1
+        rerun.stages.append((name, start - rerun.start, time.perf_counter() - start, rerun.depth))
+
+def timed(func):
+    '''
+        Decorador: cada chamada de func durante uma execução vira uma etapa com o nome da função.
+    '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_rerun() is None:
+            return func(*args, **kwargs)
+        with stage(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+# =============
+# EXECUÇÃO
+# =============
+
+def _start_profiler(name):
+    if name == 'pyinstrument':
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        return name, profiler
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return name, profiler
+
+def _stop_profiler(rerun):
+    # Perfil da execução pronto para download: html do pyinstrument ou o arquivo .prof do cProfile (snakeviz, pstats)
+    name, profiler = rerun.profiler
+    if name == 'pyinstrument':
+        profiler.stop()
+        return {'file_name': f'perfil_{rerun.page}.html', 'mime': 'text/html', 'data': profiler.output_html().encode('utf-8'),
+                'summary': profiler.output_text(unicode=True, color=False), 'page': rerun.page}
+
+    import pstats
+
+    profiler.disable()
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    # Mesmo conteúdo de stats.dump_stats(), sem passar por um arquivo
+    data = marshal.dumps(stats.stats)
+    stats.sort_stats('cumulative').print_stats(25)
+
+    return {'file_name': f'perfil_{rerun.page}.prof', 'mime': 'application/octet-stream', 'data': data,
+            'summary': summary.getvalue(), 'page': rerun.page}
+
+def start_rerun(page):
+    '''
+        Inicia a medição de uma execução da página (chamado no início do script). Se o botão do painel de depuração
+        pediu, esta execução também é perfilada.
+    '''
+    import streamlit as st
+
+    previous = current_rerun()
+    if previous is not None and previous.profiler is not None:
+        # A execução anterior foi interrompida (ex.: um filtro mudou no meio dela) com o perfilador ligado
+        _stop_profiler(previous)
+
+    rerun = Rerun(page)
+    requested = st.session_state.pop(PROFILE_REQUEST_KEY, None)
+    if requested is not None:
+        rerun.profiler = _start_profiler(requested)
+    _local.rerun = rerun
+
+    return rerun
+
+def finish_rerun():
+    '''
+        Encerra a medição da execução atual, registra as etapas no log e retorna a execução (ou None, se nenhuma
+        foi iniciada nesta thread).
+    '''
+    rerun = current_rerun()
+    if rerun is None:
+        return None
+
+    _local.rerun = None
+    rerun.total = time.perf_counter() - rerun.start
+    if rerun.profiler is not None:
+        import streamlit as st
+
+        st.session_state[PROFILE_RESULT_KEY] = _stop_profiler(rerun)
+    logger.info('%s', json.dumps({'event': 'rerun', 'page': rerun.page, 'total_ms': round(rerun.total * 1000, 3),
+                                  'profiled': rerun.profiler is not None, 'stages': rerun.records()}, ensure_ascii=False))
+
+    return rerun
+
+# =============
+# PAINEL DE DEPURAÇÃO
+# =============
+
+def debug_enabled():
+    import streamlit as st
+
+    return os.environ.get(DEBUG_ENV, '').lower() in ('1', 'true') or st.query_params.get('debug') == '1'
+
+def waterfall(rerun):
+    '''
+        Gráfico em cascata das etapas da execução: uma barra por etapa, do início ao fim dela, com as etapas
+        aninhadas recuadas abaixo da que as chamou.
+    '''
+    import plotly.graph_objects as go
+
+    records = rerun.records()
+    labels = [f"{i + 1:>2}. {'· ' * (r['depth'])}{r['stage']}" for i, r in enumerate(records)]
+    fig = go.Figure(go.Bar(y=labels, x=[r['ms'] for r in records], base=[r['start_ms'] for r in records],
+                           orientation='h', marker_color='#f74846',
+                           hovertemplate='%{y}<br>início: %{base:.1f} ms<br>duração: %{x:.1f} ms<extra></extra>'))
+    fig.update_layout(height=80 + 22 * len(records), margin=dict(l=0, r=0, t=10, b=30), showlegend=False,
+                      xaxis_title='ms desde o início da execução')
+    fig.update_yaxes(autorange='reversed')
+
+    return fig
+
+def debug_panel():
+    '''
+        Encerra a medição da execução (chamado no fim do script) e, com o modo de depuração ligado, mostra na barra
+        lateral a cascata das etapas e as opções de perfil.
+    '''
+    rerun = finish_rerun()
+    if rerun is None or not debug_enabled():
+        return
+
+    import streamlit as st
+
+    with st.sidebar.expander('⏱️ Tempo da execução', expanded=True):
+        st.caption(f'{rerun.total * 1000:.0f} ms no total, {len(rerun.stages)} etapas')
+        st.plotly_chart(waterfall(rerun), use_container_width=True)
+
+        profilers = ['cProfile'] + (['pyinstrument'] if importlib.util.find_spec('pyinstrument') else [])
+        profiler = st.radio('Perfilador', profilers, horizontal=True) if len(profilers) > 1 else profilers[0]
+        # O clique executa a página de novo, e o callback roda antes dela: é essa execução que é perfilada
+        st.button('Perfilar uma execução', on_click=st.session_state.__setitem__, args=(PROFILE_REQUEST_KEY, profiler))
+
+        profile = st.session_state.get(PROFILE_RESULT_KEY)
+        if profile is not None:
+            st.download_button(f"Baixar perfil ({profile['page']})", profile['data'], file_name=profile['file_name'],
+                               mime=profile['mime'])
+            st.code(profile['summary'][:5000], language=None)
@@ -0,0 +1,36 @@
+import numpy as np
+
+def top_n(frame, n, column, ascending=False, tie_breaker=None):
+    '''
+        Equivalente a frame.sort_values(by=[column, tie_breaker], ascending=[ascending, True]).head(n), mas sem
+        ordenar o DataFrame inteiro: uma seleção parcial (np.partition) encontra o valor da n-ésima posição e só as
+        linhas que o alcançam (incluindo os empates) são ordenadas. Com ascending=False são as maiores notas.
+
+        Sem tie_breaker, equivale a frame.sort_values(by=column, ascending=ascending).head(n): o sort_values de uma
+        coluna usa o quicksort, que não é estável, e a ordem dos empates depende de todas as linhas. Nesse caso o
+        DataFrame inteiro é ordenado, para que os empates no corte fiquem na mesma ordem.
+    '''
+    if n <= 0 or len(frame) == 0:
+        return frame.iloc[:0]
+
+    if tie_breaker is None:
+        return frame.sort_values(by=column, ascending=ascending).head(n)
+
+    if n < len(frame):
+        values = frame[column].to_numpy()
+        if ascending:
+            threshold = np.partition(values, n - 1)[n - 1]
+            frame = frame[values <= threshold]
+        else:
+            threshold = np.partition(values, len(values) - n)[len(values) - n]
+            frame = frame[values >= threshold]
+
+    # Ordenação estável: empates em todas as chaves mantêm a ordem original, como no sort_values de várias colunas
+    return frame.sort_values(by=[column, tie_breaker], ascending=[ascending, True], kind='stable').head(n)
+
+def top_restaurants(df1, n, ascending=False):
+    '''
+        Os n restaurantes com as maiores notas (ou as menores, com ascending=True), desempatados pelo menor
+        restaurant_id.
+    '''
+    return top_n(df1, n, 'aggregate_rating', ascending=ascending, tie_breaker='restaurant_id')
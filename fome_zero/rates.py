@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from fome_zero.data import CACHE_DIR
+from fome_zero.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+API_URL = 'https://api.exchangerate-api.com/v4/latest/'
+
+# Arquivo local com taxas no mesmo formato da API, para rodar o app totalmente offline
+FIXTURE_ENV = 'FOME_ZERO_RATES_FIXTURE'
+
+class RateProvider:
+    '''
+        Fornece as taxas de conversão A PARTIR de uma moeda base (por padrão o Dólar), no formato da API
+        ({'date': ..., 'rates': {...}}).
+
+        As leituras são sempre imediatas: o cache em memória é preenchido a partir do arquivo de fixture (quando
+        configurado) ou do último snapshot salvo em disco. Quando o cache passa do TTL, a atualização é feita em uma thread separada, com timeout, de forma que
+        uma API lenta ou fora do ar nunca trava a página.
+    '''
+    def __init__(self, base='USD', ttl=6*60*60, timeout=3.0, retry_after=60, cache_dir=CACHE_DIR, fixture=None):
+        self.base = base
+        self.ttl = ttl
+        self.timeout = timeout
+        self.retry_after = retry_after
+        # Snapshot persistido em disco (data + taxas) para servir leituras sem depender da rede
+        self.snapshot_path = Path(cache_dir) / f'exchange_rates_{base}.json'
+        self.fixture = fixture if fixture is not None else os.environ.get(FIXTURE_ENV)
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._data = None
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+
+    def get(self):
+        '''
+            Retorna as taxas disponíveis no momento (ou None, se nenhuma fonte tiver dados) e agenda uma atualização
+            em segundo plano quando o cache estiver expirado.
+        '''
+        with self._lock:
+            if self._data is None:
+                self._data, self._fetched_at = self._read_local()
+            data = self._data
+            now = time.time()
+            expired = now - self._fetched_at > self.ttl
+            can_retry = now - self._last_attempt > self.retry_after
+
+        if self.fixture or not can_retry:
+            return data
+
+        if data is None:
+            # Sem snapshot em disco: uma tentativa síncrona, limitada pelo timeout
+            self.refresh()
+            with self._lock:
+                return self._data
+
+        if expired:
+            self._refresh_in_background()
+
+        return data
+
+    def refresh(self):
+        '''
+            Busca as taxas na API (com timeout) e, em caso de sucesso, atualiza o cache em memória e o snapshot em disco.
+        '''
+        # O requests só é importado quando a API é consultada: com a fixture ou um snapshot recente, nunca é carregado
+        import requests
+
+        with self._lock:
+            self._last_attempt = time.time()
+
+        try:
+            response = requests.get(API_URL + str(self.base), timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            data = {'date': data['date'], 'rates': data['rates']}
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.warning('não foi possível atualizar as taxas de câmbio: %s', e)
+            return False
+
+        with self._lock:
+            self._data, self._fetched_at = data, time.time()
+        self._write_snapshot(data)
+
+        return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='fome-zero-rates', daemon=True).start()
+
+    def _read_local(self):
+        # A fixture tem prioridade: é usada para rodar offline e em benchmarks determinísticos
+        if self.fixture:
+            with open(self.fixture, encoding='utf-8') as f:
+                data = json.load(f)
+            return {'date': data['date'], 'rates': data['rates']}, time.time()
+
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                data = json.load(f)
+            return {'date': data['date'], 'rates': data['rates']}, os.path.getmtime(self.snapshot_path)
+        except (OSError, ValueError, KeyError):
+            return None, 0.0
+
+    def _write_snapshot(self, data):
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.snapshot_path.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            logger.warning('não foi possível salvar o snapshot das taxas: %s', e)
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_provider(base='USD'):
+    '''
+        Retorna o provedor de taxas compartilhado pelo processo para a moeda base.
+    '''
+    with _providers_lock:
+        if base not in _providers:
+            _providers[base] = RateProvider(base)
+
+        return _providers[base]
+
+@timed
+def get_rates(to_currency='USD'):
+    '''
+        Essa função vai obter a taxa de conversão DE uma determinada moeda PARA todas as outras moedas;
+        Por padrão, a moeda a ser convertida é o Dolar (USD), mas podemos alterar isso através do parâmetro to_currency.
+        Retorna None quando não há taxas disponíveis (sem rede, sem snapshot e sem fixture).
+    '''
+    return get_provider(to_currency).get()
@@ -0,0 +1,238 @@
+import logging
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+
+from fome_zero.cache import LRUCache
+from fome_zero.conversion import load_converted, snapshot_key
+from fome_zero.data import align_categories, current_version, load_dataset
+from fome_zero.profiling import timed
+from fome_zero.sketches import approximate, load_sketches
+from fome_zero.snapshots import load_snapshot, save_snapshot, snapshot_path
+
+logger = logging.getLogger(__name__)
+
+# Granularidade do cubo: cada linha agrega os restaurantes de um país, cidade, culinária e faixa de preço
+GRAIN = ['country', 'city', 'cuisines', 'price_range']
+
+# Colunas do dataset necessárias para montar o cubo
+COLUMNS = GRAIN + ['restaurant_id', 'average_cost_for_two', 'aggregate_rating', 'votes']
+
+# As notas vão de 0.0 a 5.0 com uma casa decimal: cada décimo é uma faixa do histograma
+RATING_BUCKETS = 51
+BUCKET_COLUMNS = [f'rating_{i:02d}' for i in range(RATING_BUCKETS)]
+
+# Cada nota k/10, como lida do CSV (o float mais próximo de k/10), em unidades de 2 ** -56: todas são múltiplos
+# inteiros dessa unidade, então as somas das notas em RATING_UNITS são exatas (inteiros do Python, sem limite)
+RATING_SCALE = 2 ** 56
+RATING_UNITS = np.array([int(Fraction(k / 10) * RATING_SCALE) for k in range(RATING_BUCKETS)], dtype=object)
+
+# Somas guardadas no cubo para cada coluna cuja média é exibida nos gráficos. A soma das notas não é guardada: ela
+# vem da distribuição das notas (ver rating_sums)
+SUMS = {'average_cost_for_two': 'cost_sum', 'votes': 'votes_sum'}
+
+def rating_sums(buckets):
+    '''
+        Soma das notas de cada linha de buckets (quantidade de restaurantes em cada décimo de nota), como float.
+    '''
+    # A média das linhas soma os floats das notas (a nota k/10 é lida do CSV como o float mais próximo de k/10). A
+    # soma exata desses floats, em inteiros de RATING_SCALE, é arredondada uma única vez para float
+    exact = np.asarray(buckets).astype(object) @ RATING_UNITS
+    return np.array([total / RATING_SCALE for total in np.atleast_1d(exact)])
+
+class Rollup:
+    '''
+        Cubo pré-agregado do dataset na granularidade (país, cidade, culinária, faixa de preço), com contagens,
+        somas e a distribuição das notas. Os gráficos reagregam este cubo (alguns milhares de linhas) em vez de
+        percorrer todos os restaurantes a cada execução da página.
+
+        A quantidade de restaurantes de cada célula é somada entre células, o que é exato porque cada
+        restaurant_id aparece em uma única linha do dataset limpo.
+
+        Com sketches (fome_zero.sketches, no modo FOME_ZERO_DISTINCT=approx), as contagens de restaurantes, cidades e
+        culinárias por país e por cidade e os totais da Home são aproximados, combinando os sketches das cidades
+        selecionadas em vez de reagregar as células.
+    '''
+    def __init__(self, cells, key=None, sketches=None):
+        self.cells = cells
+        # Identifica o conteúdo do cubo (versão do dataset, cotação e países selecionados) para o cache de figuras
+        # de fome_zero.charts; None quando o cubo não vem de load_rollup
+        self.key = key
+        self.sketches = sketches
+
+    def with_sketches(self, sketches):
+        '''
+            Retorna o mesmo cubo com as contagens de distintos aproximadas pelos sketches.
+        '''
+        return Rollup(self.cells, None if self.key is None else (self.key, 'approx'), sketches)
+
+    def _sketched(self, keys):
+        # As contagens aproximadas existem apenas por país e/ou cidade
+        return self.sketches is not None and set(keys) <= {'country', 'city'}
+
+    def countries(self, countries):
+        '''
+            Retorna o cubo restrito aos países selecionados.
+        '''
+        key = None if self.key is None else (self.key, frozenset(countries))
+        sketches = None if self.sketches is None else self.sketches.countries(countries)
+        return Rollup(self.cells[self.cells['country'].isin(countries)], key, sketches)
+
+    def _sum_by(self, keys, columns):
+        return self.cells.groupby(keys, observed=True)[columns].sum()
+
+    def restaurants_by(self, keys, rating_above=None, rating_below=None):
+        '''
+            Equivalente a df1[keys + ['restaurant_id']].groupby(keys).nunique(), opcionalmente considerando apenas
+            os restaurantes com nota acima de rating_above ou abaixo de rating_below.
+        '''
+        if rating_above is None and rating_below is None and self._sketched(keys):
+            return self.sketches.count_by(keys, 'restaurant_id')
+        if rating_above is None and rating_below is None:
+            counts = self._sum_by(keys, 'restaurants')
+        else:
+            buckets = np.arange(RATING_BUCKETS)
+            selected = np.ones(RATING_BUCKETS, dtype=bool)
+            if rating_above is not None:
+                selected &= buckets > round(rating_above * 10)
+            if rating_below is not None:
+                selected &= buckets < round(rating_below * 10)
+            counts = self._sum_by(keys, [BUCKET_COLUMNS[i] for i in buckets[selected]]).sum(axis=1)
+            counts = counts[counts > 0]
+
+        return counts.rename('restaurant_id').to_frame()
+
+    def distinct_by(self, keys, column):
+        '''
+            Equivalente a df1[keys + [column]].groupby(keys).nunique() para uma das colunas do cubo (ex.: cuisines).
+        '''
+        if column == 'cuisines' and self._sketched(keys):
+            return self.sketches.count_by(keys, column)
+        return self.cells[keys + [column]].groupby(keys, observed=True).nunique()
+
+    def mean_by(self, keys, column):
+        '''
+            Equivalente a df1[keys + [column]].groupby(keys).mean() para average_cost_for_two, aggregate_rating ou votes.
+        '''
+        if column == 'aggregate_rating':
+            # A soma exata das notas dividida pela quantidade dá a mesma média, até o último bit, que o
+            # groupby().mean() das linhas (de soma compensada) em quase todos os casos, e portanto os mesmos valores
+            # arredondados e a mesma ordem nos rankings, inclusive nos empates
+            sums = self._sum_by(keys, BUCKET_COLUMNS + ['restaurants'])
+            mean = pd.Series(rating_sums(sums[BUCKET_COLUMNS].to_numpy()), index=sums.index) / sums['restaurants']
+        else:
+            sums = self._sum_by(keys, [SUMS[column], 'restaurants'])
+            mean = sums[SUMS[column]] / sums['restaurants']
+
+        # Na ordem dos textos das chaves, como no groupby das linhas (as categorias do cubo podem estar em outra
+        # ordem depois de um delta): os rankings (fome_zero.ranking.top_n) dependem dessa ordem nos empates
+        return mean.rename(column).to_frame().sort_index(key=lambda index: index.astype(str))
+
+    def total(self, column):
+        '''
+            Total de restaurantes (restaurants), soma de uma coluna (ex.: votes) ou quantidade de valores distintos
+            de uma das colunas do cubo (ex.: city).
+        '''
+        if self.sketches is not None and column in ('restaurants', 'city', 'cuisines'):
+            return self.sketches.count('restaurant_id' if column == 'restaurants' else column)
+        if column == 'restaurants':
+            return int(self.cells['restaurants'].sum())
+        if column == 'aggregate_rating':
+            return float(rating_sums(self.cells[BUCKET_COLUMNS].to_numpy().sum(axis=0))[0])
+        if column in SUMS:
+            return self.cells[SUMS[column]].sum()
+
+        return self.cells.loc[self.cells['restaurants'] > 0, column].nunique()
+
+    def rating_counts(self):
+        '''
+            Quantidade de restaurantes por nota (uma linha por décimo de nota presente no cubo).
+        '''
+        counts = self.cells[BUCKET_COLUMNS].to_numpy().sum(axis=0)
+        present = np.flatnonzero(counts)
+
+        return pd.DataFrame({'aggregate_rating': present / 10, 'count': counts[present]})
+
+    def apply_changes(self, removed, added):
+        '''
+            Retorna o cubo depois de remover as linhas removed e incluir as linhas added do dataset: as células
+            dessas linhas são agregadas à parte e somadas (as removidas com sinal negativo) às do cubo, e as demais
+            células não mudam. As células que ficam sem restaurantes deixam de existir, como em um build_rollup do
+            dataset atualizado.
+        '''
+        parts = [self.cells]
+        if len(added):
+            parts.append(build_rollup(added).cells)
+        if len(removed):
+            negated = build_rollup(removed).cells
+            values = negated.columns.difference(GRAIN)
+            negated[values] = -negated[values]
+            parts.append(negated)
+
+        cells = pd.concat(align_categories(parts), ignore_index=True).groupby(GRAIN, observed=True).sum()
+
+        return Rollup(cells[cells['restaurants'] > 0].reset_index())
+
+@timed
+def build_rollup(df1):
+    '''
+        Monta o cubo a partir do dataset limpo (ou da sua versão convertida), em uma única passada de groupby.
+    '''
+    if not df1['restaurant_id'].is_unique:
+        logger.warning('restaurant_id repetido no dataset: as contagens de restaurantes do cubo podem ser maiores')
+
+    tenths = np.rint(df1['aggregate_rating'].to_numpy() * 10).astype('int64')
+    work = df1[GRAIN].assign(restaurant_id=df1['restaurant_id'],
+                             cost_sum=df1['average_cost_for_two'].astype('int64'),
+                             votes_sum=df1['votes'].astype('int64'))
+
+    grouped = work.groupby(GRAIN, observed=True)
+    cells = grouped.agg(restaurants=('restaurant_id', 'nunique'), cost_sum=('cost_sum', 'sum'),
+                        votes_sum=('votes_sum', 'sum'))
+
+    # Distribuição das notas de cada célula: uma coluna por décimo de nota
+    buckets = np.zeros((len(cells), RATING_BUCKETS), dtype='int32')
+    np.add.at(buckets, (grouped.ngroup().to_numpy(), np.clip(tenths, 0, RATING_BUCKETS - 1)), 1)
+    cells[BUCKET_COLUMNS] = buckets
+
+    return Rollup(cells.reset_index())
+
+# Um cubo por versão do dataset e snapshot de taxas (a versão convertida tem outro average_cost_for_two)
+_rollups = LRUCache(max_entries=4)
+
+@timed
+def load_rollup(rates=None, to_currency='USD'):
+    '''
+        Retorna o cubo do dataset na moeda original (rates=None) ou convertido para to_currency, montando-o apenas
+        uma vez por versão do dataset e snapshot de taxas. O cubo é lido do snapshot em disco (fome_zero.snapshots)
+        quando ele existir; só então as linhas do dataset são carregadas. No modo aproximado
+        (fome_zero.sketches.approximate), o cubo vem com os sketches das contagens de distintos.
+    '''
+    if rates is None:
+        key = (current_version(), None)
+        rows = lambda: load_dataset(columns=COLUMNS)
+    else:
+        current_version()
+        key = snapshot_key(rates, to_currency)
+        rows = lambda: load_converted(rates, to_currency, columns=COLUMNS)
+
+    rollup = _rollups.get_or_create(key, lambda: Rollup(load_snapshot('rollup', key, lambda: build_rollup(rows()).cells), key))
+    if approximate():
+        return rollup.with_sketches(load_sketches())
+
+    return rollup
+
+def apply_changes(changes):
+    '''
+        Atualiza o cubo em cache da versão anterior do dataset (moeda original) com as linhas removidas e
+        adicionadas por fome_zero.data.apply_changes, guardando-o com a nova versão. Os cubos convertidos para
+        outra moeda são montados novamente quando forem usados.
+    '''
+    rollup = _rollups.get((changes['old_version'], None))
+    if rollup is not None:
+        removed, added = (changes[name][COLUMNS] for name in ('removed', 'added'))
+        updated = rollup.apply_changes(removed, added)
+        updated.key = (changes['version'], None)
+        _rollups.put((changes['version'], None), updated)
+        save_snapshot(updated.cells, snapshot_path('rollup', (changes['version'], None)))
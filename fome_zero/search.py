@@ -0,0 +1,201 @@
+'''
+    Busca de restaurantes por nome, localidade, cidade ou culinária em um índice invertido montado uma vez por
+    versão do dataset: cada palavra (sem acentos e em minúsculas) aponta para as linhas em que aparece. Um termo da
+    busca casa com a palavra inteira, com o início de palavras (prefixo, para buscar enquanto se digita) ou, se nada
+    casar, com palavras parecidas (trigramas em comum, para erros de digitação). As linhas precisam casar com todos
+    os termos e são ordenadas pela qualidade do casamento, pela nota e pela quantidade de avaliações.
+'''
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from fome_zero.data import load_dataset
+from fome_zero.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Colunas indexadas (all_cuisines é a lista completa de culinárias, e não apenas a primeira)
+FIELDS = ['restaurant_name', 'locality_verbose', 'city', 'all_cuisines']
+
+# Peso de cada forma de casamento de um termo da busca
+EXACT, PREFIX, FUZZY = 3.0, 2.0, 1.0
+
+# Semelhança mínima (coeficiente de Dice dos trigramas) para considerar uma palavra com erro de digitação
+MIN_SIMILARITY = 0.5
+
+# Termos mais curtos que isso não são buscados por semelhança: teriam trigramas em comum com palavras demais
+MIN_FUZZY_LENGTH = 4
+
+_WORD = re.compile(r'[0-9a-z]+')
+
+def words(text):
+    '''
+        Palavras do texto em minúsculas e sem acentos (ex.: 'Café São Paulo' -> ['cafe', 'sao', 'paulo']).
+    '''
+    # O apóstrofo não separa palavras: "Domino's" vira "dominos"
+    text = unicodedata.normalize('NFKD', str(text).lower().replace("'", '').replace('’', ''))
+    return _WORD.findall(''.join(c for c in text if not unicodedata.combining(c)))
+
+def trigrams(word):
+    # Com espaços nas bordas, o início e o fim da palavra também viram trigramas
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _best_by_row(rows, scores):
+    # Maior peso de cada linha (uma linha pode casar o mesmo termo por mais de uma palavra)
+    order = np.lexsort((-scores, rows))
+    rows, scores = rows[order], scores[order]
+    first = np.concatenate([[True], rows[1:] != rows[:-1]]) if len(rows) else np.empty(0, dtype=bool)
+
+    return rows[first], scores[first]
+
+class SearchIndex:
+    '''
+        Índice invertido das colunas FIELDS: o vocabulário em ordem alfabética (as palavras com um mesmo prefixo
+        ficam em um trecho contínuo) e, para cada palavra, as posições das linhas em que ela aparece, guardadas em um
+        único array. Cada valor distinto de uma coluna é quebrado em palavras apenas uma vez.
+    '''
+    def __init__(self, df1):
+        ids = {}
+        pairs = []
+        for field in FIELDS:
+            codes, uniques = pd.factorize(df1[field])
+            value_words = [(i, ids.setdefault(word, len(ids))) for i, value in enumerate(uniques) for word in set(words(value))]
+            values = pd.DataFrame(value_words, columns=['value', 'word'], dtype='int64')
+            rows = pd.DataFrame({'value': codes, 'row': np.arange(len(codes))})
+            pairs.append(rows.merge(values, on='value')[['word', 'row']])
+
+        self.vocabulary = sorted(ids)
+        rank = np.empty(len(ids), dtype='int64')
+        rank[[ids[word] for word in self.vocabulary]] = np.arange(len(ids))
+
+        pairs = pd.concat(pairs, ignore_index=True)
+        word_rank = rank[pairs['word'].to_numpy()]
+        pairs = pd.DataFrame({'word': word_rank, 'row': pairs['row'].to_numpy()}).drop_duplicates()
+        pairs = pairs.sort_values(['word', 'row'])
+        self.postings = pairs['row'].to_numpy()
+        self.offsets = np.searchsorted(pairs['word'].to_numpy(), np.arange(len(self.vocabulary) + 1))
+
+        # Trigramas de cada palavra do vocabulário, para a busca por semelhança
+        grams = {}
+        for i, word in enumerate(self.vocabulary):
+            for gram in trigrams(word):
+                grams.setdefault(gram, []).append(i)
+        self.grams = {gram: np.array(words_, dtype='int64') for gram, words_ in grams.items()}
+        self.gram_counts = np.array([len(trigrams(word)) for word in self.vocabulary], dtype='int64')
+
+        self.rating = df1['aggregate_rating'].to_numpy()
+        self.votes = df1['votes'].to_numpy()
+        self.restaurant_id = df1['restaurant_id'].to_numpy()
+        self.rows = len(df1)
+
+    def _rows(self, first, last):
+        # Linhas das palavras first..last-1 do vocabulário
+        return self.postings[self.offsets[first]:self.offsets[last]]
+
+    def _similar(self, term):
+        # Palavras do vocabulário com trigramas suficientes em comum com term e a semelhança de cada uma
+        term_grams = trigrams(term)
+        found = [self.grams[gram] for gram in term_grams if gram in self.grams]
+        if not found:
+            return np.empty(0, dtype='int64'), np.empty(0)
+
+        shared = np.bincount(np.concatenate(found), minlength=len(self.vocabulary))
+        similarity = 2 * shared / (len(term_grams) + self.gram_counts)
+        similar = np.flatnonzero(similarity >= MIN_SIMILARITY)
+
+        return similar, similarity[similar]
+
+    def match(self, term):
+        '''
+            Linhas que casam com o termo e o peso de cada uma: a palavra inteira (EXACT), o início de uma palavra
+            (PREFIX) ou, quando a palavra inteira não existe, uma palavra parecida (FUZZY vezes a semelhança).
+        '''
+        # As palavras que começam com term formam um trecho contínuo do vocabulário ordenado
+        first = bisect.bisect_left(self.vocabulary, term)
+        last = bisect.bisect_left(self.vocabulary, term + '\uffff')
+        rows = [self._rows(first, last)]
+        scores = [np.full(len(rows[0]), PREFIX)]
+
+        if first < last and self.vocabulary[first] == term:
+            rows.append(self._rows(first, first + 1))
+            scores.append(np.full(len(rows[-1]), EXACT))
+        elif len(term) >= MIN_FUZZY_LENGTH:
+            for i, similarity in zip(*self._similar(term)):
+                rows.append(self._rows(i, i + 1))
+                scores.append(np.full(len(rows[-1]), FUZZY * similarity))
+
+        return _best_by_row(np.concatenate(rows), np.concatenate(scores))
+
+    def search(self, query):
+        '''
+            Posições das linhas que casam com todos os termos da busca, da mais relevante para a menos relevante
+            (soma dos pesos, depois maior nota, mais avaliações e menor restaurant_id), e a soma dos pesos de cada uma.
+        '''
+        rows = scores = None
+        for term in dict.fromkeys(words(query)):
+            term_rows, term_scores = self.match(term)
+            if rows is None:
+                rows, scores = term_rows, term_scores
+            else:
+                rows, left, right = np.intersect1d(rows, term_rows, assume_unique=True, return_indices=True)
+                scores = scores[left] + term_scores[right]
+            if len(rows) == 0:
+                break
+
+        if rows is None:
+            return np.empty(0, dtype='int64'), np.empty(0)
+
+        order = np.lexsort((self.restaurant_id[rows], -self.votes[rows], -self.rating[rows], -scores))
+
+        return rows[order], scores[order]
+
+# Um índice por versão do dataset, montado na primeira busca
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def search_index(version):
+    '''
+        Retorna o índice de busca da versão do dataset, montando-o apenas na primeira chamada.
+    '''
+    with _indexes_lock:
+        index = _indexes.get(version)
+        if index is None:
+            # Índices de versões antigas do dataset não servem mais
+            _indexes.clear()
+            start = time.perf_counter()
+            index = SearchIndex(load_dataset(columns=FIELDS + ['restaurant_id', 'aggregate_rating', 'votes']))
+            logger.info('índice de busca montado em %.3fs: %d palavras, %d linhas', time.perf_counter() - start,
+                        len(index.vocabulary), index.rows)
+            _indexes[version] = index
+
+    return index
+
+@timed
+def search_restaurants(df1, query, countries=None, limit=20):
+    '''
+        Busca os restaurantes de df1 (o dataset completo, como devolvido por load_dataset/load_converted), opcionalmente
+        apenas dos países em countries. Retorna os limit mais relevantes, a quantidade total encontrada e o tempo da
+        busca em milissegundos.
+    '''
+    start = time.perf_counter()
+    dataset_key = df1.attrs.get('dataset_key')
+    index = None if dataset_key is None else search_index(dataset_key[0])
+    if index is None or index.rows != len(df1):
+        # Assim como em fome_zero.filters, as posições do índice só valem para o dataset completo
+        raise ValueError('a busca precisa do dataset completo (load_dataset ou load_converted)')
+
+    positions, _ = index.search(query)
+    if countries is not None:
+        positions = positions[df1['country'].take(positions).isin(countries).to_numpy()]
+    results = df1.take(positions[:limit])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.debug('busca %r: %d resultados em %.2fms', query, len(positions), elapsed_ms)
+
+    return results, len(positions), elapsed_ms
@@ -0,0 +1,89 @@
+'''
+    Snapshots em disco dos agregados usados pelas páginas Visão Países e Visão Cidades (o cubo de fome_zero.rollup,
+    na moeda original e convertido, o melhor e o pior restaurante de cada país e, no modo de contagens aproximadas,
+    os sketches de fome_zero.sketches). Com eles, essas páginas são exibidas logo na inicialização do processo sem
+    carregar as linhas do dataset; as linhas só são lidas para montar um agregado que ainda não tem snapshot.
+
+    Cada snapshot é identificado pela versão do dataset (e, no cubo convertido, pelo snapshot de taxas): quando o
+    dataset ou as taxas mudam, o arquivo anterior simplesmente deixa de ser encontrado e é substituído.
+
+    Para gerá-los antecipadamente (ex.: no deploy, depois de python -m fome_zero.store): python -m fome_zero.snapshots
+'''
+import hashlib
+import logging
+import time
+
+from fome_zero import store
+from fome_zero.data import CACHE_DIR
+from fome_zero.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = CACHE_DIR / 'snapshots'
+
+def snapshot_path(name, key):
+    '''
+        Arquivo do snapshot name (ex.: 'rollup') para a chave do cache em memória correspondente: (versão, None) na
+        moeda original ou fome_zero.conversion.snapshot_key na versão convertida.
+    '''
+    mode = 'native' if key[1] is None else key[1]
+    digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    # O sufixo -{hash} faz o store.write_store remover o snapshot anterior do mesmo agregado e moeda
+    return SNAPSHOT_DIR / f'{name}.{mode}-{digest[:16]}.arrow'
+
+@timed
+def load_snapshot(name, key, build):
+    '''
+        Retorna o DataFrame do snapshot name para key, lendo-o do disco quando existir; senão o monta com build()
+        (que pode ler as linhas do dataset) e o grava para as próximas inicializações. Sem o pyarrow, apenas
+        chama build().
+    '''
+    if not store.available():
+        return build()
+
+    path = snapshot_path(name, key)
+    if path.exists():
+        start = time.perf_counter()
+        frame = store.read_store(path, store.read_schema(path))
+        logger.info('snapshot %s lido em %.3fs', path.name, time.perf_counter() - start)
+        return frame
+
+    frame = build()
+    save_snapshot(frame, path)
+
+    return frame
+
+def save_snapshot(frame, path):
+    '''
+        Grava o DataFrame como snapshot em path (sem o pyarrow, não faz nada).
+    '''
+    if not store.available():
+        return
+
+    try:
+        store.write_store(frame, path)
+    except OSError as e:
+        logger.warning('não foi possível gravar o snapshot %s: %s', path.name, e)
+
+def main():
+    from fome_zero.champions import load_extremes
+    from fome_zero.rates import get_rates
+    from fome_zero.rollup import load_rollup
+    from fome_zero.sketches import approximate, load_sketches
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    start = time.perf_counter()
+    load_rollup()
+    load_extremes()
+    if approximate():
+        load_sketches()
+    rates = get_rates()
+    if rates is None:
+        print('cotações indisponíveis: apenas os snapshots na moeda original foram gerados')
+    else:
+        load_rollup(rates)
+    print(f'snapshots gerados em {SNAPSHOT_DIR} em {time.perf_counter() - start:.2f}s')
+
+if __name__ == '__main__':
+    main()
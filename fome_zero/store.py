@@ -0,0 +1,143 @@
+'''
+    Armazenamento colunar (Arrow IPC / Feather, sem compressão) do dataset já limpo. O arquivo é identificado pelo
+    hash do CSV de origem e lido com memory-map, carregando apenas as colunas pedidas por cada página.
+
+    Para gerar o arquivo antecipadamente (ex.: no deploy): python -m fome_zero.store [caminho/do/arquivo.csv]
+'''
+import functools
+import logging
+import os
+import sys
+from pathlib import Path
+
+from fome_zero.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+@functools.cache
+def available():
+    '''
+        Indica se o pyarrow está instalado (ele está no requirements.txt). Sem ele, o app continua funcionando a
+        partir do CSV, mas limpando o dataset a cada inicialização e sem os snapshots: isso é registrado no log
+        uma vez por processo.
+    '''
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logger.warning('pyarrow não instalado: o dataset é lido do CSV e limpo a cada inicialização, sem o arquivo '
+                       'colunar, a ingestão em blocos e os snapshots (instale as dependências do requirements.txt)')
+        return False
+
+    return True
+
+def store_path(cache_dir, csv_path, digest):
+    return Path(cache_dir) / f'{Path(csv_path).stem}-{digest[:16]}.arrow'
+
+def write_store(df, path):
+    '''
+        Grava o DataFrame limpo no formato Feather v2 sem compressão (necessário para o memory-map) e remove
+        arquivos gerados a partir de versões anteriores do mesmo CSV.
+    '''
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    tmp = path.with_suffix('.tmp')
+    feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+    remove_old_versions(path)
+
+def write_batches(frames, path):
+    '''
+        Grava no mesmo formato de write_store uma sequência de DataFrames com as mesmas colunas e tipos (as colunas
+        categóricas devem ter as mesmas categorias em todos), mantendo em memória apenas um deles por vez.
+        Retorna a quantidade de linhas gravadas.
+    '''
+    import pyarrow as pa
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    rows = 0
+    writer = schema = None
+    try:
+        with pa.OSFile(str(tmp), 'wb') as sink:
+            for frame in frames:
+                # O primeiro lote define o schema; os demais são convertidos para ele
+                table = pa.Table.from_pandas(frame.reset_index(drop=True), schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(sink, schema)
+                writer.write_table(table)
+                rows += len(frame)
+            if writer is not None:
+                writer.close()
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    if writer is None:
+        tmp.unlink(missing_ok=True)
+        raise ValueError(f'nenhum lote para gravar em {path}')
+    os.replace(tmp, path)
+
+    return rows
+
+def remove_old_versions(path):
+    '''
+        Remove os arquivos gerados a partir de versões anteriores do mesmo CSV.
+    '''
+    path = Path(path)
+    stem = path.stem.rsplit('-', 1)[0]
+    for old in path.parent.glob(f'{stem}-*.arrow'):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+def read_schema(path):
+    '''
+        Retorna o nome das colunas gravadas no arquivo, sem ler os dados.
+    '''
+    import pyarrow as pa
+
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+@timed
+def read_store(path, columns):
+    '''
+        Lê apenas as colunas pedidas do arquivo, mapeado em memória. As colunas de texto repetido voltam como
+        categorias (o Arrow guarda os dicionários gravados a partir das categorias do pandas) e as demais colunas de
+        texto continuam no formato do Arrow (string[pyarrow]), sem um objeto Python por linha.
+    '''
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    table = feather.read_table(path, columns=list(columns), memory_map=True)
+    strings = pd.StringDtype('pyarrow')
+
+    return table.to_pandas(types_mapper={pa.string(): strings, pa.large_string(): strings}.get)
+
+def read_batches(path):
+    '''
+        Lê o arquivo lote a lote (como foi gravado), devolvendo um DataFrame por lote. Sem memory-map: cada lote é
+        lido e liberado, sem manter o arquivo inteiro mapeado em memória.
+    '''
+    import pyarrow as pa
+
+    with pa.OSFile(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i).to_pandas()
+
+def main(argv):
+    from fome_zero.data import CACHE_DIR, DATASET_PATH, build_store
+
+    csv_path = Path(argv[0]) if argv else DATASET_PATH
+    path = build_store(csv_path, CACHE_DIR)
+    print(f'{path} gerado a partir de {csv_path}')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
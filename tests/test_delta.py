@@ -0,0 +1,71 @@
+'''
+    Um delta aplicado por fome_zero.delta deve deixar o dataset, o cubo agregado e a versão gravada em disco iguais
+    aos que sairiam de reprocessar o CSV já com as alterações.
+'''
+import pandas as pd
+import pytest
+
+from fome_zero import data, maps, rollup, snapshots, store
+from fome_zero.cache import LRUCache
+from fome_zero.data import DATASET_PATH, data_clean
+from fome_zero.delta import apply_delta
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch):
+    # Caches em memória e em disco vazios, para que o teste não use nem altere os do app
+    monkeypatch.setattr(data, 'CACHE_DIR', tmp_path / 'cache')
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', tmp_path / 'cache' / 'snapshots')
+    monkeypatch.setattr(data, '_cache', data._DatasetCache())
+    monkeypatch.setattr(rollup, '_rollups', LRUCache(max_entries=4))
+    monkeypatch.setattr(maps, '_rendered', LRUCache(max_entries=4))
+
+    return tmp_path
+
+def comparable(df):
+    # As categorias do dataset atualizado incluem as das linhas removidas; os valores são comparados como texto
+    df = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    return df.reset_index(drop=True)
+
+def test_delta_matches_clean_of_edited_csv(isolated, monkeypatch):
+    raw = pd.read_csv(DATASET_PATH).drop_duplicates('Restaurant ID').head(300).reset_index(drop=True)
+    path = isolated / 'zomato.csv'
+    raw.to_csv(path, index=False)
+
+    updated, deleted, dropped = raw.loc[[10, 20, 30], 'Restaurant ID']
+    update = raw[raw['Restaurant ID'] == updated].assign(**{'Aggregate rating': 4.9, 'Votes': 1234, 'Cuisines': 'Martian'})
+    drop = raw[raw['Restaurant ID'] == dropped].assign(Address=None)
+    insert = raw.iloc[[40]].assign(**{'Restaurant ID': 99_000_000, 'City': 'Nova Cidade'})
+    pd.concat([update.assign(Operation='update'), drop.assign(Operation='update'), insert.assign(Operation='insert'),
+               pd.DataFrame({'Restaurant ID': [deleted], 'Operation': 'delete'})]).to_csv(isolated / 'delta.csv', index=False)
+
+    # CSV editado à mão: a atualização no lugar da linha original, a inclusão no fim e sem as linhas removidas
+    edited = raw.copy()
+    edited.loc[edited['Restaurant ID'] == updated] = update.to_numpy()
+    edited = pd.concat([edited[~edited['Restaurant ID'].isin([deleted, dropped])], insert])
+    expected = data_clean(edited)
+
+    # Cubo em cache da versão anterior, que o delta atualiza apenas nas células alteradas
+    old_version = data.current_version(path)
+    rollup._rollups.put((old_version, None), rollup.build_rollup(data.load_dataset(path, columns=rollup.COLUMNS)))
+    stats = apply_delta(isolated / 'delta.csv', path)
+    assert (stats['upserts'], stats['deletes'], stats['dropped']) == (2, 1, 1)
+
+    # (a) o dataset atualizado é o mesmo da limpeza do CSV editado
+    merged = data.load_dataset(path)
+    assert merged.attrs['dataset_key'][0] == stats['version'] != old_version
+    pd.testing.assert_frame_equal(comparable(merged), comparable(expected))
+
+    # (b) o cubo atualizado incrementalmente é o mesmo de montar o cubo de novo
+    cube = rollup._rollups.get((stats['version'], None))
+    full = rollup.build_rollup(merged[rollup.COLUMNS]).cells
+    sort = lambda cells: comparable(cells.sort_values(rollup.GRAIN))
+    pd.testing.assert_frame_equal(sort(cube.cells), sort(full))
+
+    # (c) um novo processo encontra a versão atualizada pelo manifesto em .cache/zomato.deltas.json
+    if not store.available():
+        pytest.skip('sem o pyarrow, o dataset atualizado não é gravado em disco')
+    assert data.manifest_path(path).exists()
+    monkeypatch.setattr(data, '_cache', data._DatasetCache())
+    fresh = data.load_dataset(path)
+    assert fresh.attrs['dataset_key'][0] == stats['version']
+    pd.testing.assert_frame_equal(comparable(fresh), comparable(merged))
@@ -0,0 +1,48 @@
+'''
+    A ingestão em blocos (fome_zero.ingest) deve gravar as mesmas linhas que o read_clean do arquivo ou do diretório
+    inteiro, mesmo quando as linhas repetidas caem em blocos ou arquivos diferentes.
+'''
+import pandas as pd
+import pytest
+
+from fome_zero import store
+from fome_zero.data import DATASET_PATH, read_clean
+from fome_zero.ingest import ingest_csv, ingest_shards
+
+pytestmark = pytest.mark.skipif(not store.available(), reason='a ingestão em blocos grava no formato colunar (pyarrow)')
+
+@pytest.fixture(scope='module')
+def raw():
+    return pd.read_csv(DATASET_PATH)
+
+def ingested(store_file, path):
+    expected = read_clean(path).reset_index(drop=True)
+    return store.read_store(store_file, list(expected.columns)), expected
+
+def test_ingest_csv_removes_duplicates_across_chunks(raw, tmp_path):
+    rows = raw.head(400)
+    # Linhas dos primeiros blocos repetidas nos últimos, além de uma repetição dentro do mesmo bloco
+    path = tmp_path / 'zomato.csv'
+    pd.concat([rows, rows.iloc[[3, 75, 160, 161]], rows.iloc[[399]]]).to_csv(path, index=False)
+
+    stats = ingest_csv(path, tmp_path / 'zomato-test.arrow', chunksize=50)
+    assert stats['chunks'] == 9 and stats['duplicates'] >= 5
+
+    result, expected = ingested(tmp_path / 'zomato-test.arrow', path)
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_ingest_shards_keeps_first_restaurant(raw, tmp_path):
+    shards = tmp_path / 'shards'
+    shards.mkdir()
+    rows = raw[raw['Country Code'].isin([30, 214, 215])]
+    for code, group in rows.groupby('Country Code'):
+        group.to_csv(shards / f'country_{code:03d}.csv', index=False)
+    # Arquivo com restaurantes que já aparecem nos outros (com a nota alterada, então não são linhas idênticas)
+    overlap = rows.groupby('Country Code').head(5).assign(**{'Aggregate rating': 0.5})
+    overlap.to_csv(shards / 'zz_overlap.csv', index=False)
+
+    stats = ingest_shards(shards, tmp_path / 'shards-test.arrow', workers=2, chunksize=40)
+    assert stats['duplicates'] >= len(overlap)
+
+    result, expected = ingested(tmp_path / 'shards-test.arrow', shards)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,47 @@
+'''
+    Os rankings de fome_zero.ranking devem sair na mesma ordem do sort_values().head(n), inclusive quando o corte
+    cai no meio de um empate.
+'''
+import numpy as np
+import pandas as pd
+import pytest
+
+from fome_zero.aggregations import rating_per_cuisine
+from fome_zero.data import DATASET_PATH, data_clean
+from fome_zero.ranking import top_n, top_restaurants
+from fome_zero.rollup import build_rollup
+
+@pytest.fixture(scope='module')
+def df1():
+    return data_clean(pd.read_csv(DATASET_PATH))
+
+def ties(rows=60, seed=0):
+    # Médias com muitos empates (e mais de 16 linhas, acima do que o quicksort ordena por inserção)
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'aggregate_rating': rng.integers(0, 6, rows) / 2},
+                        index=pd.Index([f'culinaria_{i:03d}' for i in range(rows)], name='cuisines'))
+
+@pytest.mark.parametrize('ascending', [False, True])
+def test_top_n_tie_at_cut(ascending):
+    frame = ties()
+    for n in range(1, len(frame) + 2):
+        expected = frame.sort_values(by='aggregate_rating', ascending=ascending).head(n)
+        pd.testing.assert_frame_equal(top_n(frame, n, 'aggregate_rating', ascending=ascending), expected)
+
+@pytest.mark.parametrize('ascending', [False, True])
+def test_top_restaurants_matches_sort(df1, ascending):
+    expected = df1.sort_values(by=['aggregate_rating', 'restaurant_id'], ascending=[ascending, True]).head(20)
+    pd.testing.assert_frame_equal(top_restaurants(df1, 20, ascending=ascending), expected)
+
+@pytest.mark.parametrize('ascending', [False, True])
+def test_rating_per_cuisine_matches_rows(df1, ascending):
+    # Mesma tabela que o gráfico das culinárias calculava sobre as linhas (ex.: a pior culinária é Mineira, empatada
+    # com Drinks Only em 0.0)
+    cube = build_rollup(df1)
+    means = df1[['cuisines', 'aggregate_rating']].groupby('cuisines', observed=True).mean()
+    means.index = means.index.astype(str)
+    for n in range(1, 21):
+        expected = means.sort_values(by='aggregate_rating', ascending=ascending).reset_index().round(2).head(n)
+        result = rating_per_cuisine(cube, n, ascending=ascending)
+        result['cuisines'] = result['cuisines'].astype(str)
+        pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,42 @@
+'''
+    As médias do cubo (fome_zero.rollup) arredondadas como nos gráficos devem ser as mesmas do groupby().mean() das
+    linhas do dataset.
+'''
+import pandas as pd
+import pytest
+
+from fome_zero.data import DATASET_PATH, data_clean
+from fome_zero.rollup import build_rollup
+
+@pytest.fixture(scope='module')
+def df1():
+    return data_clean(pd.read_csv(DATASET_PATH))
+
+@pytest.fixture(scope='module')
+def cube(df1):
+    return build_rollup(df1)
+
+def selections(df1):
+    # Todos os países e cada país sozinho, como nos filtros das páginas
+    countries = sorted(df1['country'].unique())
+    return [countries] + [[country] for country in countries]
+
+@pytest.mark.parametrize('key', ['country', 'city', 'cuisines'])
+@pytest.mark.parametrize('column', ['aggregate_rating', 'average_cost_for_two', 'votes'])
+def test_mean_by_matches_rows(df1, cube, key, column):
+    for countries in selections(df1):
+        rows = df1[df1['country'].isin(countries)]
+        expected = rows[[key, column]].groupby(key, observed=True).mean()
+        expected.index = expected.index.astype(str)
+        result = cube.countries(countries).mean_by([key], column)
+        result.index = result.index.astype(str)
+
+        assert list(result.index) == sorted(expected.index)
+        pd.testing.assert_series_equal(result[column].round(2), expected[column].sort_index().round(2),
+                                       check_names=False, check_index_type=False, obj=f'{key} {countries}')
+
+@pytest.mark.parametrize('column', ['aggregate_rating', 'average_cost_for_two', 'votes'])
+def test_total_matches_rows(df1, cube, column):
+    for countries in selections(df1):
+        rows = df1[df1['country'].isin(countries)]
+        assert cube.countries(countries).total(column) == pytest.approx(rows[column].sum(), rel=1e-12)